@@ -1,14 +1,19 @@
 # app/auth.py (OAuth2 + JWT + RBAC helpers)
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
-from jose import jwt, JWTError
 from sqlalchemy.orm import Session
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import os
-from app.database import SessionLocal
-from app import crud  # service uses crud (we'll use UserService in routers)
+import threading
+import time
+import uuid
+from app import crud, database  # service uses crud (we'll use UserService in routers)
 from app.logger_config import get_logger
 from app.cache import cache
+from app.passwords import get_password_hash, verify_password  # re-exported for services and scripts
+from app.revocation import revocations
+from app.schemas import Principal
 
 logger = get_logger("clinic.auth")
 
@@ -16,43 +21,103 @@ SECRET_KEY = os.getenv("CLINIC_SECRET", "change-this-secret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 1 day
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/token")  # token endpoint
 
 
-def verify_password(plain, hashed):
-    return pwd_context.verify(plain, hashed)
+# bcrypt runs on its own small pool so a login burst queues here instead of
+# occupying the shared request threadpool; past the queue limit callers get 503
+HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", "2"))
+HASH_QUEUE_LIMIT = int(os.getenv("AUTH_HASH_QUEUE_LIMIT", "32"))
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+class HashingOverloaded(Exception):
+    """Raised when the hashing queue is full; routers answer 503."""
+
+
+class HashingPool:
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            logger.warning("Hashing pool saturated; rejecting request")
+            raise HashingOverloaded()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        fut = self._executor.submit(fn, *args)
+        # the slot is held until bcrypt finishes, even if the client goes away
+        fut.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(fut)
+
+
+hashing_pool = HashingPool(HASH_WORKERS, HASH_QUEUE_LIMIT)
+
+
+async def verify_password_async(plain, hashed) -> bool:
+    return await hashing_pool.run(verify_password, plain, hashed)
+
+
+async def get_password_hash_async(password) -> str:
+    return await hashing_pool.run(get_password_hash, password)
 
 
 def create_access_token(*, data: dict, expires_delta: int | None = None):
     to_encode = data.copy()
     import datetime
     expire = datetime.datetime.utcnow() + datetime.timedelta(minutes=(expires_delta or ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    # jti names the token for logout; iat lets a user-wide revocation cut off older tokens
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex})
+    from jose import jwt  # imported on first use: keeps it off the app's import path
     token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    # store lightweight session in redis
-    cache.create_session(token, {"username": data.get("sub", ""), "role": data.get("role", "")})
+    # store lightweight session in redis; get_current_user serves RBAC from it
+    username = data.get("sub", "")
+    cache.create_session(token, {"username": username, "role": data.get("role", ""),
+                                 "gen": str(cache.generation(user_namespace(username)))})
     return token
 
 
+def token_id(token: str, payload: dict) -> str:
+    # tokens issued before jti existed are named by their signature
+    return payload.get("jti") or token.rsplit(".", 1)[-1]
+
+
+def revoke_token(db: Session, token: str):
+    """Log a token out: every worker rejects it from its next revocation sync on."""
+    from jose import jwt
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    revocations.revoke_token(db, token_id(token, payload), payload["exp"])
+    cache.delete_session(token)
+
+
+def user_namespace(username: str) -> str:
+    """Cache namespace bumped whenever the user's record or role changes."""
+    return f"user:{username}"
+
+
 def get_db():
-    db = SessionLocal()
+    db = database.SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
+    """
+    Resolve the caller from the session cache (in-process, then Redis). A DB session
+    is only opened when the session is missing or the user's generation moved on.
+    Being sync, FastAPI runs this (and its Redis calls) on the threadpool, also in
+    async mode.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate":"Bearer"},
     )
+    from jose import jwt, JWTError
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -62,10 +127,18 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError as e:
         logger.warning("JWT error: %s", e)
         raise credentials_exception
-    user = crud.get_user_by_username(db, username)
+    if revocations.is_revoked(token_id(token, payload), username, payload.get("iat")):
+        raise credentials_exception
+    gen = str(cache.generation(user_namespace(username)))
+    session = cache.get_session(token)
+    if session and session.get("username") == username and session.get("gen") == gen:
+        return Principal(username=username, role=session["role"])
+    with database.SessionLocal() as db:
+        user = crud.get_user_by_username(db, username)
     if not user:
         raise credentials_exception
-    return user
+    cache.create_session(token, {"username": user.username, "role": user.role, "gen": gen})
+    return Principal(username=user.username, role=user.role)
 
 
 def require_roles(*roles):
@@ -1,8 +1,11 @@
 # app/cache.py
-import redis
+import asyncio
 import os
 import json
-from typing import Optional, Dict
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import Optional, Dict, Tuple, Union
 from app.logger_config import get_logger
 
 logger = get_logger("clinic.cache")
@@ -11,63 +14,576 @@ REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 REDIS_DB = int(os.getenv("REDIS_DB", "10"))
 
-try:
-    redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
-    redis_client.ping()
-    logger.info("Connected to Redis")
-except Exception as e:
-    logger.warning("Redis unavailable: %s", e)
-    redis_client = None
+# Redis is reached through a bounded pool with short timeouts and at most one
+# immediate retry (redis-py's default is ten with backoff), so an outage costs a
+# request milliseconds, and after REDIS_FAILURE_THRESHOLD connection errors within
+# REDIS_FAILURE_WINDOW seconds nothing at all (see RedisLink)
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "64"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.25"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.25"))
+REDIS_RETRIES = int(os.getenv("REDIS_RETRIES", "1"))
+REDIS_FAILURE_THRESHOLD = int(os.getenv("REDIS_FAILURE_THRESHOLD", "3"))
+REDIS_FAILURE_WINDOW = float(os.getenv("REDIS_FAILURE_WINDOW", "10"))
+REDIS_RETRY_SECONDS = float(os.getenv("REDIS_RETRY_SECONDS", "1"))
+REDIS_MAX_BACKOFF = float(os.getenv("REDIS_MAX_BACKOFF", "30"))
 
-CACHE_TTL = 300  # 5 minutes
+
+def on_event_loop() -> bool:
+    """True in async code, including sync code run from it (AsyncSession.run_sync)."""
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def connect_redis():
+    """Build the client; no I/O happens until its first command."""
+    import redis  # imported with the first cache access, not with the app
+    from redis.backoff import NoBackoff
+    from redis.retry import Retry
+    pool = redis.BlockingConnectionPool(
+        host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True,
+        max_connections=REDIS_MAX_CONNECTIONS, timeout=REDIS_SOCKET_TIMEOUT,
+        socket_timeout=REDIS_SOCKET_TIMEOUT, socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        retry=Retry(NoBackoff(), REDIS_RETRIES))
+    return redis.Redis(connection_pool=pool)
+
+
+# entries are invalidated by namespace generation, so the TTL only bounds memory
+CACHE_TTL = int(os.getenv("CACHE_TTL", str(6 * 3600)))  # 6 hours
 SESSION_TTL = 86400  # 24 hours
+REVOKED_VERSION = "revoked:version"
+
+# In-process L1, sized per namespace (the key prefix before the first ":").
+# CACHE_L1_SIZES overrides entries, e.g. "patient=4096,medicines=512".
+L1_DEFAULT_SIZE = int(os.getenv("CACHE_L1_DEFAULT_SIZE", "1024"))
+L1_SIZES = {"patient": 4096, "medicines": 1024, "gen": 8192, "lgen": 8192, "session": 8192}
+for _item in filter(None, os.getenv("CACHE_L1_SIZES", "").split(",")):
+    _ns, _, _size = _item.partition("=")
+    L1_SIZES[_ns.strip()] = int(_size)
+# how long a worker trusts its local copy of a generation read from Redis; bounds
+# cross-worker staleness after another worker invalidates. While Redis is unreachable
+# it is also how often it is asked again; the process-local generation meanwhile
+# stays put until this worker invalidates, so the L1 keeps serving.
+GEN_TTL = float(os.getenv("CACHE_GEN_TTL", "1"))
+# sessions are re-validated against the user's generation, so a short L1 life is enough
+SESSION_L1_TTL = float(os.getenv("SESSION_L1_TTL", "300"))
+# namespaces invalidated while Redis is unreachable are queued for replay; past this
+# many the queue collapses into one "bump every generation" marker
+PENDING_NAMESPACES_MAX = int(os.getenv("CACHE_PENDING_NAMESPACES_MAX", "1024"))
+
+
+class LocalCache:
+    """
+    Bounded LRU with a per-entry TTL. Thread-safe; one instance per namespace.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] < now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value, ttl: float):
+        expires = time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "size": len(self._data), "maxsize": self.maxsize}
+
+
+class RedisLink:
+    """
+    Lazily built Redis client behind a circuit breaker. `client` is None while the
+    circuit is open, so Cache methods skip Redis with one attribute check instead of
+    waiting on a dead socket; a daemon thread pings with exponential backoff and
+    closes the circuit (then calls `on_reconnect`) once Redis answers again.
+    """
+
+    def __init__(self, factory, threshold: int = REDIS_FAILURE_THRESHOLD, window: float = REDIS_FAILURE_WINDOW,
+                 retry_seconds: float = REDIS_RETRY_SECONDS, max_backoff: float = REDIS_MAX_BACKOFF):
+        self.factory = factory  # None: no Redis at all
+        self.threshold, self.window = threshold, window
+        self.retry_seconds, self.max_backoff = retry_seconds, max_backoff
+        self.on_reconnect = None
+        self.is_open = False
+        self.reached = False  # has any command ever succeeded
+        self.opened = 0  # how many times the circuit has tripped
+        self._client = None
+        self._failures: deque = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self.is_open or self.factory is None:
+            return None
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self.factory()
+        return self._client
+
+    def failure(self):
+        """Record a connection error; trips the circuit at `threshold` within `window` seconds."""
+        now = time.monotonic()
+        with self._lock:
+            self._failures.append(now)
+            while self._failures and self._failures[0] < now - self.window:
+                self._failures.popleft()
+            if self.is_open or len(self._failures) < self.threshold:
+                return
+            self.is_open = True
+            self.opened += 1
+            self._failures.clear()
+        logger.warning("Redis circuit open after %s errors; reconnecting in the background", self.threshold)
+        threading.Thread(target=self._reconnect, name="redis-reconnect", daemon=True).start()
+
+    def _reconnect(self):
+        delay = self.retry_seconds
+        while True:
+            time.sleep(delay)
+            try:
+                self._client.ping()
+                break
+            except Exception:
+                delay = min(delay * 2, self.max_backoff)
+        with self._lock:
+            self.is_open = False
+            self.reached = True
+        logger.info("Redis reachable again; circuit closed")
+        if self.on_reconnect:
+            try:
+                self.on_reconnect()
+            except Exception as e:
+                logger.error("Redis reconnect hook error: %s", e)
 
 
 class Cache:
+    """
+    Two-tier cache: a per-process LocalCache (L1) in front of Redis (L2).
+    Without Redis the L1 still serves, but namespace generations are process-local:
+    they only move when this worker invalidates, and other workers' invalidations
+    never reach them, so several workers need Redis to see each other's writes.
+    Invalidations and revocations made while Redis is unreachable are replayed to
+    it on reconnect, so no worker keeps serving a generation that moved meanwhile.
+    The replay queue is bounded: before Redis was ever reached, or past
+    PENDING_NAMESPACES_MAX namespaces, it becomes a single marker that bumps every
+    generation in Redis.
+    """
+
     def __init__(self, client):
-        self.client = client
+        # a RedisLink, or a plain client / None (tests): wrapped in a link that never builds one
+        self.link = client if isinstance(client, RedisLink) else RedisLink((lambda: client) if client else None)
+        self.link.on_reconnect = self._reconnected
+        self._l1: Dict[str, LocalCache] = {}
+        self._l1_lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending_namespaces: set = set()
+        self._pending_all = False
+        self._pending_revocation = False
+        self.remote_hits = 0
+        self.remote_misses = 0
 
-    def get(self, key: str) -> Optional[str]:
-        if not self.client:
-            return None
+    @property
+    def client(self):
+        return self.link.client
+
+    def _failed(self, e: Exception):
+        import redis  # already loaded: the error came from a client
+        if isinstance(e, (redis.ConnectionError, redis.TimeoutError)):
+            self.link.failure()
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Call a (sync) cache method from async code. While Redis may be consulted it
+        runs on the threadpool, so a slow Redis never stalls the event loop; with no
+        Redis, or the circuit open, it is L1 only and runs inline.
+        """
+        if self.link.factory is None or self.link.is_open:
+            return fn(*args, **kwargs)
+        from starlette.concurrency import run_in_threadpool
+        return await run_in_threadpool(fn, *args, **kwargs)
+
+    def _reconnected(self):
+        with self._pending_lock:
+            namespaces, self._pending_namespaces = self._pending_namespaces, set()
+            bump_all, self._pending_all = self._pending_all, False
+            revoked, self._pending_revocation = self._pending_revocation, False
+        # generations cached during the outage were process-local; read Redis' again,
+        # and mint fresh local ones next time: the old ones' entries may be stale by then
+        self.local("gen:").clear()
+        self.local("lgen:").clear()
+        if bump_all:
+            self._invalidate_all()
+        elif namespaces:
+            self.invalidate(*namespaces)
+        if revoked:
+            self.bump_revocations()
+
+    def _first_contact(self):
+        # Redis answered for the first time without the circuit ever tripping
+        self.link.reached = True
+        self._reconnected()
+
+    def _defer(self, namespaces):
+        """Queue invalidations Redis missed, for _reconnected to replay."""
+        if self.link.factory is None:
+            return
+        with self._pending_lock:
+            if (self._pending_all or not self.link.reached
+                    or len(self._pending_namespaces) + len(namespaces) > PENDING_NAMESPACES_MAX):
+                # Redis never reached (other workers may still have used it), or too
+                # many to list: bump every generation instead, in O(1) memory
+                self._pending_all, self._pending_namespaces = True, set()
+            else:
+                self._pending_namespaces.update(namespaces)
+
+    def _invalidate_all(self):
+        client = self.client
         try:
-            v = self.client.get(key)
-            if v:
-                logger.info("Cache hit %s", key)
+            if not client:
+                raise ConnectionError("Redis unavailable")
+            pipe = client.pipeline(transaction=False)
+            for gkey in client.scan_iter(match="gen:*", count=1000):
+                pipe.incr(gkey)
+            pipe.execute()
+            logger.info("Cache invalidated every namespace")
+        except Exception as e:
+            if client:
+                self._failed(e)
+            logger.error("Cache invalidate-all error: %s", e)
+            with self._pending_lock:
+                self._pending_all = True
+
+    def local(self, key: str) -> LocalCache:
+        ns = key.split(":", 1)[0]
+        l1 = self._l1.get(ns)
+        if l1 is None:
+            with self._l1_lock:
+                l1 = self._l1.setdefault(ns, LocalCache(L1_SIZES.get(ns, L1_DEFAULT_SIZE)))
+        return l1
+
+    def get(self, key: str) -> Optional[Union[str, bytes]]:
+        l1 = self.local(key)
+        v = l1.get(key)
+        if v is not None:
+            logger.info("Cache hit %s (l1)", key)
             return v
+        client = self.client
+        if not client:
+            return None
+        try:
+            v = client.get(key)
         except Exception as e:
+            self._failed(e)
             logger.error("Cache get error: %s", e)
             return None
+        if v:
+            self.remote_hits += 1
+            logger.info("Cache hit %s", key)
+            l1.set(key, v, CACHE_TTL)
+        else:
+            self.remote_misses += 1
+        return v
 
     def set(self, key: str, value, ttl: int = CACHE_TTL):
-        if not self.client:
+        # str/bytes are stored as given (pre-serialized bodies), anything else as JSON
+        val = value if isinstance(value, (str, bytes)) else json.dumps(value, default=str)
+        self.local(key).set(key, val, ttl)
+        client = self.client
+        if not client:
             return
         try:
-            val = value if isinstance(value, str) else json.dumps(value, default=str)
-            self.client.setex(key, ttl, val)
+            client.setex(key, ttl, val)
             logger.info("Cache set %s (ttl=%s)", key, ttl)
         except Exception as e:
+            self._failed(e)
             logger.error("Cache set error: %s", e)
 
+    # -------------------------
+    # Shared hashes (counters)
+    # -------------------------
+    # Not mirrored in L1: callers want the cross-worker value. Return None when
+    # Redis is unavailable so callers can fall back to process-local state.
+
+    def hincr(self, key: str, deltas: Dict[str, int]):
+        if not deltas or not self.client:
+            return
+        if on_event_loop():
+            # async-mode services run on the loop: like invalidate, send it from a thread
+            asyncio.get_running_loop().run_in_executor(None, self._hincr, key, deltas)
+            return
+        self._hincr(key, deltas)
+
+    def _hincr(self, key: str, deltas: Dict[str, int]):
+        client = self.client
+        if not client:
+            return
+        try:
+            pipe = client.pipeline(transaction=True)
+            for field, delta in deltas.items():
+                pipe.hincrby(key, field, delta)
+            pipe.execute()
+        except Exception as e:
+            self._failed(e)
+            logger.error("Cache hincr error: %s", e)
+
+    def hgetall(self, key: str) -> Optional[Dict]:
+        client = self.client
+        if not client:
+            return None
+        try:
+            return client.hgetall(key) or None
+        except Exception as e:
+            self._failed(e)
+            logger.error("Cache hgetall error: %s", e)
+            return None
+
+    def hset(self, key: str, mapping: Dict):
+        client = self.client
+        if not client:
+            return
+        try:
+            client.hset(key, mapping=mapping)
+        except Exception as e:
+            self._failed(e)
+            logger.error("Cache hset error: %s", e)
+
+    # -------------------------
+    # Token revocation
+    # -------------------------
+    # Revocations live in the database (app.revocation). Redis only carries
+    # REVOKED_VERSION, bumped on every change, so workers reload the tables only
+    # when it moved instead of on every sync.
+
+    def bump_revocations(self):
+        client = self.client
+        if not client:
+            if self.link.factory is not None:
+                self._pending_revocation = True
+            return
+        try:
+            client.incr(REVOKED_VERSION)
+        except Exception as e:
+            self._failed(e)
+            logger.error("Revocation bump error: %s", e)
+            self._pending_revocation = True
+
+    def revocation_version(self) -> Optional[int]:
+        client = self.client
+        if not client:
+            return None
+        try:
+            return int(client.get(REVOKED_VERSION) or 0)
+        except Exception as e:
+            self._failed(e)
+            logger.error("Revocation version error: %s", e)
+            return None
+
+    def flush(self) -> bool:
+        """Drop every entry in this process and in the Redis DB; True if Redis was flushed."""
+        for l1 in list(self._l1.values()):
+            l1.clear()
+        client = self.client
+        if not client:
+            return False
+        try:
+            client.flushdb()
+            return True
+        except Exception as e:
+            self._failed(e)
+            logger.error("Cache flush error: %s", e)
+            return False
+
+    def stats(self) -> Dict:
+        """Per-namespace L1 counters plus Redis hit/miss totals and circuit state."""
+        return {"l1": {ns: l1.stats() for ns, l1 in list(self._l1.items())},
+                "redis": {"hits": self.remote_hits, "misses": self.remote_misses,
+                          "circuit_open": self.link.is_open, "circuit_trips": self.link.opened}}
+
+    # -------------------------
+    # Versioned namespaces
+    # -------------------------
+    # Every cached key lives under a namespace generation ("patients:v17:...").
+    # Writers bump the generation with one atomic INCR; readers build keys from the
+    # current generation, so stale entries are never read again and simply age out.
+
+    def generation(self, ns: str) -> int:
+        return self._generation(ns)[0]
+
+    def shared_generation(self, ns: str) -> Optional[int]:
+        """
+        The generation of `ns` if it was read from Redis, so every worker agrees on it;
+        None while it is process-local (no Redis, circuit open, or a local bump not yet
+        sent). Anything handed to clients, like ETags, must only be built from this.
+        """
+        v, shared = self._generation(ns)
+        return v if shared else None
+
+    def _generation(self, ns: str) -> Tuple[int, bool]:
+        # L1 holds (generation, read from Redis?)
+        gkey = f"gen:{ns}"
+        l1 = self.local(gkey)
+        entry = l1.get(gkey)
+        if entry is not None:
+            return entry
+        client = self.client
+        if client:
+            try:
+                v = client.get(gkey)
+                if v is None:
+                    # seed from the clock so a flushed Redis never reissues an old generation
+                    client.set(gkey, int(time.time() * 1000), nx=True)
+                    v = client.get(gkey)
+                entry = (int(v), True)
+                if not self.link.reached:
+                    self._first_contact()
+                l1.set(gkey, entry, GEN_TTL)
+                self.local(f"lgen:{ns}").delete(f"lgen:{ns}")  # Redis moves it from here on
+                return entry
+            except Exception as e:
+                self._failed(e)
+                logger.error("Cache generation error: %s", e)
+        # process-local generation: stable until this worker bumps it, so L1 entries
+        # keep serving; the GEN_TTL copy only decides when Redis is tried again
+        entry = (self._local_generation(ns), False)
+        l1.set(gkey, entry, GEN_TTL)
+        return entry
+
+    def _local_generation(self, ns: str) -> int:
+        # clock-seeded, so one minted again after eviction never reissues an old value
+        lkey = f"lgen:{ns}"
+        l1 = self.local(lkey)
+        v = l1.get(lkey)
+        if v is None:
+            v = int(time.time() * 1000)
+            l1.set(lkey, v, CACHE_TTL)
+        return v
+
+    def key(self, ns: str, *parts) -> str:
+        """Build a cache key under the current generation of namespace `ns`."""
+        return ":".join([ns, f"v{self.generation(ns)}", *map(str, parts)])
+
+    def invalidate(self, *namespaces: str):
+        """Atomically move each namespace to a new generation."""
+        if not namespaces:
+            return
+        if self.client and on_event_loop():
+            # async-mode services run on the loop: bump locally now, tell Redis from a thread
+            self._bump_local(namespaces)
+            asyncio.get_running_loop().run_in_executor(None, self._invalidate, namespaces)
+            return
+        self._invalidate(namespaces)
+
+    def _bump_local(self, namespaces):
+        # from the L1 copies only, never Redis; clock-seeded like a process-local generation
+        for ns in namespaces:
+            gkey, lkey = f"gen:{ns}", f"lgen:{ns}"
+            current, _ = self.local(gkey).get(gkey) or (0, False)
+            v = max(current, self.local(lkey).get(lkey) or 0) + 1
+            v = max(v, int(time.time() * 1000))
+            self.local(lkey).set(lkey, v, CACHE_TTL)
+            self.local(gkey).set(gkey, (v, False), GEN_TTL)
+
+    def _invalidate(self, namespaces):
+        client = self.client
+        if client:
+            try:
+                pipe = client.pipeline(transaction=True)
+                for ns in namespaces:
+                    pipe.set(f"gen:{ns}", int(time.time() * 1000), nx=True)
+                    pipe.incr(f"gen:{ns}")
+                pipe.execute()
+                logger.info("Cache invalidated %s", ",".join(namespaces))
+                # this worker sees its own writes immediately; others within GEN_TTL
+                for ns in namespaces:
+                    self.local(f"gen:{ns}").delete(f"gen:{ns}")
+                    self.local(f"lgen:{ns}").delete(f"lgen:{ns}")
+                return
+            except Exception as e:
+                self._failed(e)
+                logger.error("Cache invalidate error: %s", e)
+        self._bump_local(namespaces)
+        self._defer(namespaces)
+
     def create_session(self, token: str, payload: Dict):
-        if not self.client:
+        key = f"session:{token}"
+        self.local(key).set(key, dict(payload), SESSION_L1_TTL)
+        client = self.client
+        if not client:
             return
         try:
-            self.client.hset(f"session:{token}", mapping=payload)
-            self.client.expire(f"session:{token}", SESSION_TTL)
+            # one round trip; MULTI/EXEC so a session never exists without its TTL
+            pipe = client.pipeline(transaction=True)
+            pipe.hset(key, mapping=payload)
+            pipe.expire(key, SESSION_TTL)
+            pipe.execute()
         except Exception as e:
+            self._failed(e)
             logger.error("Session create error: %s", e)
 
+    def delete_session(self, token: str):
+        key = f"session:{token}"
+        self.local(key).delete(key)
+        client = self.client
+        if not client:
+            return
+        try:
+            client.delete(key)
+        except Exception as e:
+            self._failed(e)
+            logger.error("Session delete error: %s", e)
+
     def get_session(self, token: str) -> Optional[Dict]:
-        if not self.client:
+        key = f"session:{token}"
+        l1 = self.local(key)
+        d = l1.get(key)
+        if d is not None:
+            return d
+        client = self.client
+        if not client:
             return None
         try:
-            d = self.client.hgetall(f"session:{token}")
-            return d if d else None
+            d = client.hgetall(key)
         except Exception as e:
+            self._failed(e)
             logger.error("Session get error: %s", e)
             return None
+        if not d:
+            return None
+        l1.set(key, d, SESSION_L1_TTL)
+        return d
 
 
 # instantiate default cache (importable)
-cache = Cache(redis_client)
+cache = Cache(RedisLink(connect_redis))
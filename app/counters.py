@@ -0,0 +1,93 @@
+# app/counters.py
+# Incrementally maintained counters behind /reports/overview. Writers adjust them
+# as they change rows; reads are a single Redis HGETALL (or a dict lookup without
+# Redis). Reconciliation recounts from the database to repair drift: lost
+# increments, other workers when Redis is down, and appointments that stop being
+# "upcoming" simply because time passed. It runs on the read path whenever the
+# last recount is older than COUNTERS_RECONCILE_SECONDS (or a write marked the
+# counters dirty); the overview read is the only consumer, so nobody sees values
+# older than that, and an idle deployment does no recounting at all.
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from sqlalchemy.orm import Session
+from app.cache import cache, Cache
+from app.models import Patient, Appointment, Medicine
+from app.logger_config import get_logger
+
+logger = get_logger("clinic.counters")
+
+RECONCILE_INTERVAL = float(os.getenv("COUNTERS_RECONCILE_SECONDS", "60"))
+FIELDS = ("total_patients", "upcoming_appointments", "low_stock_medicines")
+
+
+def is_upcoming(status: Optional[str], scheduled_at: Optional[datetime]) -> bool:
+    if status != "scheduled" or scheduled_at is None:
+        return False
+    if scheduled_at.tzinfo is not None:
+        # stored times are naive UTC (see reports); normalize aware inputs
+        scheduled_at = scheduled_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return scheduled_at >= datetime.utcnow()
+
+
+def is_low_stock(quantity: Optional[int], threshold: Optional[int]) -> bool:
+    return quantity is not None and threshold is not None and quantity <= threshold
+
+
+class OverviewCounters:
+    KEY = "counters:overview"
+
+    def __init__(self, store: Cache, reconcile_interval: float = RECONCILE_INTERVAL):
+        self.store = store
+        self.reconcile_interval = reconcile_interval
+        self._local: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, **deltas: int):
+        deltas = {k: v for k, v in deltas.items() if v}
+        if not deltas:
+            return
+        with self._lock:
+            # before the first reconciliation there is nothing to adjust
+            if self._local:
+                for k, v in deltas.items():
+                    self._local[k] = self._local.get(k, 0) + v
+        self.store.hincr(self.KEY, deltas)
+
+    def mark_dirty(self):
+        """Force a recount on the next read, for changes whose effect is unknown."""
+        self.incr(dirty=1)
+
+    def snapshot(self, db: Session) -> Dict[str, int]:
+        values = self.store.hgetall(self.KEY)
+        if values is None:
+            with self._lock:
+                values = dict(self._local)
+        if self._stale(values):
+            values = self.reconcile(db)
+        return {k: int(float(values.get(k, 0))) for k in FIELDS}
+
+    def _stale(self, values: Dict) -> bool:
+        if "reconciled_at" not in values or int(float(values.get("dirty", 0))) > 0:
+            return True
+        return time.time() - float(values["reconciled_at"]) > self.reconcile_interval
+
+    def reconcile(self, db: Session) -> Dict[str, float]:
+        values = {
+            "total_patients": db.query(Patient).count(),
+            "upcoming_appointments": db.query(Appointment).filter(
+                Appointment.scheduled_at >= datetime.utcnow(), Appointment.status == "scheduled").count(),
+            "low_stock_medicines": db.query(Medicine).filter(Medicine.quantity <= Medicine.reorder_threshold).count(),
+            "dirty": 0,
+            "reconciled_at": time.time(),
+        }
+        with self._lock:
+            self._local = dict(values)
+        self.store.hset(self.KEY, values)
+        logger.info("Reconciled overview counters %s", {k: values[k] for k in FIELDS})
+        return values
+
+
+counters = OverviewCounters(cache)
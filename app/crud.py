@@ -3,9 +3,10 @@ from typing import Optional, List
 from sqlalchemy.orm import Session
 from datetime import datetime
 
-from app import models, schemas
+from app import models, schemas, search
 from app.logger_config import get_logger
-from app import auth
+from app import passwords
+from app.services.medicine_service import adjust_stock_stmt
 
 logger = get_logger("clinic.crud")
 
@@ -35,16 +36,12 @@ def get_patient(db: Session, patient_id: int) -> Optional[models.Patient]:
 def list_patients(db: Session, skip: int = 0, limit: int = 10, q: Optional[str] = None) -> List[models.Patient]:
     """
     List patients with optional search query (searches first_name, last_name, phone) and pagination.
+    Searches go through the FTS index and come back ranked.
     """
-    qs = db.query(models.Patient)
     if q:
-        like = f"%{q}%"
-        qs = qs.filter(
-            (models.Patient.first_name.like(like)) |
-            (models.Patient.last_name.like(like)) |
-            (models.Patient.phone.like(like))
-        )
-    results = qs.order_by(models.Patient.id).offset(skip).limit(limit).all()
+        results = [p for p, _ in search.search_patients(db, q, skip=skip, limit=limit)]
+    else:
+        results = db.query(models.Patient).order_by(models.Patient.id).offset(skip).limit(limit).all()
     logger.info("Listed patients skip=%s limit=%s q=%s returned=%s", skip, limit, q, len(results))
     return results
 
@@ -136,13 +133,14 @@ def search_medicines(db: Session, q: Optional[str] = None, skip: int = 0, limit:
 
 
 def adjust_medicine_stock(db: Session, medicine_id: int, delta: int) -> Optional[models.Medicine]:
-    m = get_medicine(db, medicine_id)
+    # single atomic UPDATE ... RETURNING; see MedicineService.adjust
+    m = db.scalars(adjust_stock_stmt({medicine_id: delta})).one_or_none()
     if not m:
+        db.rollback()
         logger.warning("Adjust stock failed: medicine not found id=%s", medicine_id)
         return None
-    m.quantity = max(0, m.quantity + delta)
+    db.expunge(m)
     db.commit()
-    db.refresh(m)
     logger.info("Adjusted medicine id=%s delta=%s new_qty=%s", m.id, delta, m.quantity)
     return m
 
@@ -158,7 +156,7 @@ def create_user(db: Session, payload: schemas.UserCreate) -> models.User:
     if existing:
         logger.warning("Create user failed: username exists %s", payload.username)
         return None
-    hashed = auth.get_password_hash(payload.password)
+    hashed = passwords.get_password_hash(payload.password)
     u = models.User(username=payload.username, full_name=payload.full_name, role=payload.role, hashed_password=hashed)
     db.add(u)
     db.commit()
@@ -176,7 +174,7 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[mod
     if not u:
         logger.info("Authentication failed: username not found %s", username)
         return None
-    if not auth.verify_password(password, u.hashed_password):
+    if not passwords.verify_password(password, u.hashed_password):
         logger.info("Authentication failed: invalid password for %s", username)
         return None
     logger.info("Authenticated user %s", username)
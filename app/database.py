@@ -1,13 +1,91 @@
 # app/database.py
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import StaticPool
 
-DATABASE_URL = "sqlite:///./clinic_oop.db"
+# Configuration comes from the environment, e.g.
+#   DATABASE_URL=postgresql+psycopg://clinic:secret@db/clinic DB_POOL_SIZE=20
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./clinic_oop.db")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# PostgreSQL (and other server databases): sized QueuePool with pre-ping
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# SQLite: WAL lets readers run alongside the writer; the rest trade a little
+# durability on power loss (synchronous=NORMAL is still safe under WAL) for speed
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # negative = KiB, i.e. 64 MiB
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "temp_store": "MEMORY",
+}
+
+# opt-in async mode: hot CRUD routes run on an AsyncEngine (aiosqlite for SQLite)
+ASYNC_DB = os.getenv("DB_ASYNC", "0").lower() in ("1", "true", "yes")
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def engine_options(url: str) -> dict:
+    """create_engine keyword arguments for the profile matching `url`."""
+    if url.startswith("sqlite"):
+        opts = {"connect_args": {"check_same_thread": False}}
+        if ":memory:" in url or url.rstrip("/").endswith(":"):
+            # one shared connection, otherwise every checkout sees an empty database
+            opts["poolclass"] = StaticPool
+        return opts
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+def apply_sqlite_pragmas(dbapi_conn, connection_record):
+    cur = dbapi_conn.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cur.execute(f"PRAGMA {name}={value}")
+    cur.close()
+
+
+def build_engine(url: str = DATABASE_URL):
+    eng = create_engine(url, **engine_options(url))
+    if eng.dialect.name == "sqlite":
+        event.listen(eng, "connect", apply_sqlite_pragmas)
+    return eng
+
+
+engine = build_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 Base = declarative_base()
 
+async_engine = None
+AsyncSessionLocal = None
+
+
+def async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+def init_async_engine(url: str = DATABASE_URL):
+    """Create the AsyncEngine on first use so aiosqlite is only needed in async mode."""
+    global async_engine, AsyncSessionLocal
+    if async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        async_engine = create_async_engine(async_url(url), **engine_options(url))
+        if async_engine.dialect.name == "sqlite":
+            event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+        # expire_on_commit=False: responses read attributes after commit without lazy IO
+        AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    return async_engine
+
 
 def get_db():
     db = SessionLocal()
@@ -15,3 +93,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    init_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,65 @@
+# app/export.py
+# Streaming table exports (NDJSON / CSV) that run in constant memory: rows are read
+# with a server-side cursor in yield_per chunks and serialized chunk by chunk.
+import csv
+import io
+import json
+from typing import Iterator
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app import database
+from app.logger_config import get_logger
+
+logger = get_logger("clinic.export")
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _json_default(v):
+    return v.isoformat() if hasattr(v, "isoformat") else str(v)
+
+
+def stream_rows(db: Session, model, fmt: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """Yield `model`'s table in primary-key order, one serialized chunk at a time."""
+    cols = list(model.__table__.columns)
+    keys = [c.key for c in cols]
+    # plain column tuples: no ORM identity map, no per-row model construction
+    result = db.execute(select(*cols).order_by(model.id).execution_options(yield_per=chunk_size))
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if fmt == "csv":
+        writer.writerow(keys)
+    count = 0
+    for part in result.partitions():
+        if fmt == "csv":
+            writer.writerows(part)
+        else:
+            for row in part:
+                buf.write(json.dumps(dict(zip(keys, row)), default=_json_default))
+                buf.write("\n")
+        count += len(part)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+    logger.info("Exported %s rows from %s as %s", count, model.__tablename__, fmt)
+
+
+def export_response(model, fmt: str) -> StreamingResponse:
+    """
+    StreamingResponse over stream_rows. The generator opens its own session so it
+    stays valid for the whole stream regardless of when request dependencies close.
+    """
+    def body():
+        db = database.SessionLocal()
+        try:
+            yield from stream_rows(db, model, fmt)
+        finally:
+            db.close()
+
+    filename = f"{model.__tablename__}.{'csv' if fmt == 'csv' else 'ndjson'}"
+    return StreamingResponse(body(), media_type=EXPORT_FORMATS[fmt],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
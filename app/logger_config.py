@@ -1,13 +1,139 @@
 # app/logger_config.py
+# Non-blocking logging: loggers under "clinic" hand records to a bounded queue
+# (QueueHandler) and one listener thread formats and writes them, so request
+# threads never wait on stdout. Output is one JSON object per line (LOG_FORMAT=text
+# for the classic format). High-volume INFO messages are sampled per message
+# template (LOG_SAMPLING, e.g. "clinic.cache=100" keeps 1 in 100 "Cache hit %s"
+# records); warnings and errors are never sampled.
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Dict
 
+ROOT_LOGGER = "clinic"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
 
-def get_logger(name: str = "clinic"):
-    logger = logging.getLogger(name)
-    if not logger.handlers:
-        logger.setLevel(logging.INFO)
-        ch = logging.StreamHandler()
-        fmt = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
-        ch.setFormatter(logging.Formatter(fmt))
-        logger.addHandler(ch)
-    return logger
+
+def parse_sampling(spec: str) -> Dict[str, int]:
+    """'clinic.cache=100,clinic.crud=10' -> {'clinic.cache': 100, 'clinic.crud': 10}"""
+    rates = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        name, _, n = item.partition("=")
+        rates[name.strip()] = max(1, int(n))
+    return rates
+
+
+LOG_SAMPLING = parse_sampling(os.getenv("LOG_SAMPLING", "clinic.cache=100"))
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep 1 in N records below WARNING per (logger, message template), where N comes
+    from the most specific matching entry in `rates`. The first record of each
+    template always passes; kept records carry `sample_rate` so counts can be scaled.
+    """
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = rates
+        self._seen: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def rate_for(self, name: str) -> int:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return 1
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        n = self.rate_for(record.name)
+        if n == 1:
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            seen = self._seen.get(key, 0)
+            self._seen[key] = seen + 1
+        if seen % n:
+            return False
+        record.sample_rate = n
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "sample_rate", 1) > 1:
+            out["sample_rate"] = record.sample_rate
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never block or raise when the queue is full: drop the record and count it."""
+    dropped = 0
+    _exc_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        # only what the listener thread cannot do later: merge args (they may be mutable)
+        # and render the traceback; the output format is applied by the listener
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+_handler = None
+_listener = None
+_setup_lock = threading.Lock()
+
+
+def _queue_handler() -> logging.Handler:
+    global _handler, _listener
+    with _setup_lock:
+        if _handler is None:
+            stream = logging.StreamHandler()
+            stream.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+            q = queue.Queue(LOG_QUEUE_SIZE)
+            _listener = logging.handlers.QueueListener(q, stream, respect_handler_level=True)
+            _listener.start()
+            atexit.register(_listener.stop)  # drain what is queued on shutdown
+            _handler = DroppingQueueHandler(q)
+            _handler.addFilter(SamplingFilter(LOG_SAMPLING))
+    return _handler
+
+
+def get_logger(name: str = ROOT_LOGGER):
+    # handlers live on the "clinic" logger; children reach them by propagation
+    owner = logging.getLogger(ROOT_LOGGER if name.startswith(ROOT_LOGGER + ".") else name)
+    if not owner.handlers:
+        owner.setLevel(LOG_LEVEL)
+        owner.addHandler(_queue_handler())
+    return logging.getLogger(name)
@@ -1,18 +1,44 @@
 # app/main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.database import engine, Base
+from fastapi.responses import Response
+from app.database import engine, SessionLocal, ASYNC_DB
 from app.logger_config import get_logger
 from app.routers import users, patients, appointments, medicines, reports
-# from app.cache import redis_client
+from app.search import medicine_index
+from app.migrations import on_startup as prepare_schema
+from app import metrics
+from app.reminders import REMINDERS_ENABLED, reminder_scheduler
 
 logger = get_logger("clinic.main")
 
-# create DB tables
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Clinic Management System")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # nothing touches the database at import time; schema work (if any, see
+    # SCHEMA_ON_STARTUP) runs here, before the first request is accepted
+    prepare_schema(engine)
+    # warm in-process indexes before the first request
+    db = SessionLocal()
+    try:
+        medicine_index.load(db)
+    finally:
+        db.close()
+    if REMINDERS_ENABLED:
+        reminder_scheduler.start()
+    yield
+    reminder_scheduler.stop()
+
+
+app = FastAPI(title="Clinic Management System", lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
 
 # include routers
+if ASYNC_DB:
+    # async routes first: they take over the hot paths, the sync routers serve the rest
+    from app.routers import async_users, async_patients, async_appointments, async_medicines
+    for r in (async_users, async_patients, async_appointments, async_medicines):
+        app.include_router(r.router)
 app.include_router(users.router)
 app.include_router(patients.router)
 app.include_router(appointments.router)
@@ -23,3 +49,8 @@ app.include_router(reports.router)
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
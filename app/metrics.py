@@ -0,0 +1,208 @@
+# app/metrics.py
+# Request instrumentation exposed in Prometheus text format on /metrics.
+# MetricsMiddleware records per-route latency histograms, status codes and
+# in-flight requests; SQLAlchemy engine events count and time the statements a
+# request issues (via a contextvar the middleware sets), so N+1 regressions show
+# up as a shifted db_statements_per_request histogram. Cache hit/miss counters
+# are read from app.cache at scrape time. Metrics are per process.
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.cache import cache
+from app.logger_config import DroppingQueueHandler
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ""
+    inner = ",".join('{}="{}"'.format(n, str(v).replace("\\", "\\\\").replace('"', '\\"')) for n, v in zip(names, values))
+    return "{" + inner + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, v in items:
+            yield f"{self.name}{_labels(self.labels, labels)} {v}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, tuple(buckets)
+        self._values: Dict[Tuple, List] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, *labels, value: float):
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        names = self.labels + ("le",)
+        for labels, row in items:
+            for bound, n in zip(self.buckets, row):
+                yield f"{self.name}_bucket{_labels(names, labels + (bound,))} {n}"
+            yield f"{self.name}_bucket{_labels(names, labels + ('+Inf',))} {row[-1]}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {round(row[-2], 6)}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {row[-1]}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self, extra: Iterable = ()) -> str:
+        lines = []
+        for m in list(self.metrics) + list(extra):
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(m.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status code.", ("method", "route", "status")))
+LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "Request latency by route template.", ("method", "route")))
+IN_FLIGHT = registry.register(Gauge("http_requests_in_flight", "Requests currently being served."))
+SQL_PER_REQUEST = registry.register(Histogram(
+    "db_statements_per_request", "SQL statements issued per request.", ("method", "route"), COUNT_BUCKETS))
+SQL_TIME = registry.register(Histogram(
+    "db_statement_seconds_per_request", "Time spent in SQL per request.", ("method", "route")))
+SQL_TOTAL = registry.register(Counter("db_statements_total", "SQL statements executed, inside or outside requests."))
+
+
+class RequestStats:
+    __slots__ = ("statements", "sql_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+
+
+# set by the middleware; threadpool endpoints and run_sync inherit it, so the
+# engine hooks below add to the right request
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("metrics_started")
+    elapsed = time.perf_counter() - started.pop() if started else 0.0
+    SQL_TOTAL.inc()
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_seconds += elapsed
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware task hop on the hot path)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        IN_FLIGHT.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            IN_FLIGHT.dec()
+            current_request.reset(token)
+            route = scope.get("route")
+            # templates ("/patients/{patient_id}") keep label cardinality bounded
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            REQUESTS.inc(method, path, status["code"])
+            LATENCY.observe(method, path, value=elapsed)
+            SQL_PER_REQUEST.observe(method, path, value=stats.statements)
+            SQL_TIME.observe(method, path, value=stats.sql_seconds)
+
+
+def cache_metrics(stats: Dict) -> List:
+    """Scrape-time gauges/counters from Cache.stats()."""
+    hits = Counter("cache_l1_hits_total", "In-process cache hits by namespace.", ("namespace",))
+    misses = Counter("cache_l1_misses_total", "In-process cache misses by namespace.", ("namespace",))
+    evictions = Counter("cache_l1_evictions_total", "In-process cache LRU evictions by namespace.", ("namespace",))
+    size = Gauge("cache_l1_entries", "In-process cache entries by namespace.", ("namespace",))
+    for ns, s in sorted(stats.get("l1", {}).items()):
+        hits.inc(ns, amount=s["hits"])
+        misses.inc(ns, amount=s["misses"])
+        evictions.inc(ns, amount=s["evictions"])
+        size.inc(ns, amount=s["size"])
+    redis_hits = Counter("cache_redis_hits_total", "Redis cache hits.")
+    redis_misses = Counter("cache_redis_misses_total", "Redis cache misses.")
+    circuit_open = Gauge("cache_redis_circuit_open", "1 while Redis is being skipped after repeated errors.")
+    trips = Counter("cache_redis_circuit_trips_total", "Times the Redis circuit breaker opened.")
+    redis = stats.get("redis", {})
+    redis_hits.inc(amount=redis.get("hits", 0))
+    redis_misses.inc(amount=redis.get("misses", 0))
+    circuit_open.inc(amount=int(redis.get("circuit_open", False)))
+    trips.inc(amount=redis.get("circuit_trips", 0))
+    return [hits, misses, evictions, size, redis_hits, redis_misses, circuit_open, trips]
+
+
+def render() -> str:
+    dropped = Counter("log_records_dropped_total", "Log records dropped because the log queue was full.")
+    dropped.inc(amount=DroppingQueueHandler.dropped)
+    return registry.render(cache_metrics(cache.stats()) + [dropped])
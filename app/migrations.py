@@ -0,0 +1,133 @@
+# app/migrations.py
+# Versioned schema changes for databases created by an older release.
+# create_all() only creates missing tables; anything that changes an existing
+# table (indexes, columns) goes here as a numbered step. Applied versions are
+# recorded in schema_migrations, and every statement is idempotent, so
+# create_all-built databases (which already have the models' indexes) and
+# concurrent startups are both safe.
+#
+# Schema work runs before serving, not at import: as a deploy step
+# (`python -m app.migrations`, or `--check-schema` to only verify) or from the
+# app's lifespan according to SCHEMA_ON_STARTUP: "migrate" (default) prepares the
+# database only when check() finds something missing, "check" refuses to start
+# on an unprepared database, "off" skips both.
+import argparse
+import os
+import sys
+from datetime import datetime
+from typing import List, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from app.logger_config import get_logger
+
+logger = get_logger("clinic.migrations")
+
+VERSION_TABLE = "schema_migrations"
+
+# (version, description, statements); append only, never edit a released step
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "composite indexes for appointment listing, reports, slots and reminders", [
+        "CREATE INDEX IF NOT EXISTS ix_appointments_status_scheduled_at ON appointments (status, scheduled_at)",
+        "CREATE INDEX IF NOT EXISTS ix_appointments_scheduled_at ON appointments (scheduled_at)",
+        "CREATE INDEX IF NOT EXISTS ix_appointments_patient_id_scheduled_at ON appointments (patient_id, scheduled_at)",
+        "CREATE INDEX IF NOT EXISTS ix_medicines_low_stock ON medicines (id) WHERE quantity <= reorder_threshold",
+        "DROP INDEX IF EXISTS ix_reminder_jobs_due_at",
+        "CREATE INDEX IF NOT EXISTS ix_reminder_jobs_status_due_at ON reminder_jobs (status, due_at)",
+    ]),
+]
+
+LATEST = MIGRATIONS[-1][0]
+
+
+def _ensure_version_table(conn: Connection):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} "
+        "(version INTEGER PRIMARY KEY, description VARCHAR NOT NULL, applied_at TIMESTAMP NOT NULL)"
+    ))
+
+
+def current_version(conn: Connection) -> int:
+    _ensure_version_table(conn)
+    return conn.execute(text(f"SELECT COALESCE(MAX(version), 0) FROM {VERSION_TABLE}")).scalar()
+
+
+def migrate(engine: Engine) -> List[int]:
+    """Apply pending migrations, each in its own transaction. Returns the versions applied."""
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        with engine.begin() as conn:
+            if current_version(conn) >= version:
+                continue
+            for stmt in statements:
+                conn.execute(text(stmt))
+            conn.execute(text(f"INSERT INTO {VERSION_TABLE} (version, description, applied_at) "
+                              "VALUES (:v, :d, :t)"), {"v": version, "d": description, "t": datetime.utcnow()})
+        logger.info("Applied migration %s: %s", version, description)
+        applied.append(version)
+    return applied
+
+
+SCHEMA_ON_STARTUP = os.getenv("SCHEMA_ON_STARTUP", "migrate").lower()
+
+
+def check(engine: Engine) -> List[str]:
+    """Read-only: what prepare() would still have to do (empty when the schema is current)."""
+    from app.models import Base
+    from app.search import FTS_TABLE
+
+    names = set(inspect(engine).get_table_names())
+    problems = [f"missing table {t}" for t in Base.metadata.tables if t not in names]
+    version = 0
+    if VERSION_TABLE in names:
+        with engine.connect() as conn:
+            version = conn.execute(text(f"SELECT COALESCE(MAX(version), 0) FROM {VERSION_TABLE}")).scalar()
+    if version < LATEST:
+        problems.append(f"schema version {version}, expected {LATEST}")
+    if engine.dialect.name == "sqlite" and FTS_TABLE not in names:
+        problems.append(f"missing search index {FTS_TABLE}")
+    return problems
+
+
+def prepare(engine: Engine) -> List[int]:
+    """Bring a new or older database up to date: tables, migrations, search index."""
+    from app.models import Base
+    from app.search import ensure_patient_index
+
+    Base.metadata.create_all(bind=engine)
+    applied = migrate(engine)
+    ensure_patient_index(engine)
+    return applied
+
+
+def on_startup(engine: Engine):
+    if SCHEMA_ON_STARTUP == "off":
+        return
+    problems = check(engine)
+    if not problems:
+        return
+    if SCHEMA_ON_STARTUP == "check":
+        raise RuntimeError("Database schema is not ready ({}); run `python -m app.migrations`".format(
+            "; ".join(problems)))
+    prepare(engine)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Create or upgrade the database schema (DATABASE_URL).")
+    ap.add_argument("--check-schema", action="store_true",
+                    help="only report what is missing; exit 1 unless the schema is current")
+    args = ap.parse_args(argv)
+    from app.database import engine
+
+    if args.check_schema:
+        problems = check(engine)
+        for p in problems:
+            print(p)
+        print("schema is current" if not problems else "schema is NOT current")
+        return 1 if problems else 0
+    applied = prepare(engine)
+    print(f"applied migrations: {applied}" if applied else f"schema is current (version {LATEST})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
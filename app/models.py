@@ -1,5 +1,5 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -22,6 +22,12 @@ class Patient(Base):
 
 class Appointment(Base):
     __tablename__ = "appointments"
+    # keep in sync with app/migrations.py, which adds these to existing databases
+    __table_args__ = (
+        Index("ix_appointments_status_scheduled_at", "status", "scheduled_at"),
+        Index("ix_appointments_scheduled_at", "scheduled_at"),
+        Index("ix_appointments_patient_id_scheduled_at", "patient_id", "scheduled_at"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
     scheduled_at = Column(DateTime, nullable=False)
@@ -30,10 +36,45 @@ class Appointment(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     patient = relationship("Patient", back_populates="appointments")
+    history = relationship("AppointmentStatusHistory", back_populates="appointment",
+                           order_by="AppointmentStatusHistory.id")
+
+
+class AppointmentStatusHistory(Base):
+    """One row per status change or reschedule, written by AppointmentService."""
+    __tablename__ = "appointment_status_history"
+    id = Column(Integer, primary_key=True, index=True)
+    appointment_id = Column(Integer, ForeignKey("appointments.id"), nullable=False, index=True)
+    status = Column(String, nullable=False)
+    scheduled_at = Column(DateTime, nullable=False)
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    appointment = relationship("Appointment", back_populates="history")
+
+
+class ReminderJob(Base):
+    """One pending/sent reminder per appointment; see reminders.py."""
+    __tablename__ = "reminder_jobs"
+    __table_args__ = (Index("ix_reminder_jobs_status_due_at", "status", "due_at"),)
+    id = Column(Integer, primary_key=True, index=True)
+    appointment_id = Column(Integer, ForeignKey("appointments.id"), nullable=False, unique=True)
+    due_at = Column(DateTime, nullable=False)
+    status = Column(String, default="pending", nullable=False)  # pending/claimed/sent/canceled/failed
+    attempts = Column(Integer, default=0, nullable=False)
+    claimed_by = Column(String)
+    claimed_at = Column(DateTime)
+    sent_at = Column(DateTime)
+    last_error = Column(Text)
 
 
 class Medicine(Base):
     __tablename__ = "medicines"
+    # partial index: only low-stock rows, so the reports count never walks the whole table
+    __table_args__ = (
+        Index("ix_medicines_low_stock", "id",
+              sqlite_where=text("quantity <= reorder_threshold"),
+              postgresql_where=text("quantity <= reorder_threshold")),
+    )
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
     manufacturer = Column(String)
@@ -49,3 +90,18 @@ class User(Base):
     full_name = Column(String)
     role = Column(String, default="staff")  # admin, doctor, nurse, staff
     hashed_password = Column(String, nullable=False)
+
+
+# Token revocation (see revocation.py). Times are epoch seconds, like the JWT claims.
+class RevokedToken(Base):
+    """A logged-out token, kept until it would have expired anyway."""
+    __tablename__ = "revoked_tokens"
+    jti = Column(String, primary_key=True)
+    exp = Column(Float, nullable=False, index=True)
+
+
+class TokenCutoff(Base):
+    """Tokens of `username` issued before `issued_before` are rejected."""
+    __tablename__ = "token_cutoffs"
+    username = Column(String, primary_key=True)
+    issued_before = Column(Float, nullable=False)
@@ -0,0 +1,35 @@
+# app/pagination.py
+# Opaque keyset cursors: a cursor is the sort key of the last row a client saw,
+# so the next page is a range seek instead of an OFFSET scan.
+import base64
+import json
+from typing import Callable, Optional, Sequence
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *converters: Callable) -> tuple:
+    """
+    Decode a cursor produced by encode_cursor, applying one converter per key part.
+    Raises ValueError for anything malformed so routers can answer 400.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(converters):
+            raise ValueError("cursor shape mismatch")
+        return tuple(conv(v) for conv, v in zip(converters, values))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def next_cursor(rows: Sequence, limit: int, key: Callable) -> Optional[str]:
+    """
+    Cursor for the page after `rows`, or None when this page was the last one.
+    """
+    if len(rows) < limit or not rows:
+        return None
+    return encode_cursor(*key(rows[-1]))
@@ -0,0 +1,20 @@
+# app/passwords.py
+# Password hashing. passlib, and the bcrypt backend it loads, are imported on
+# first use rather than at app import, so workers that only serve token-authed
+# requests never load them. Kept apart from auth.py so crud can hash without
+# importing the auth layer.
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def verify_password(plain, hashed):
+    return context().verify(plain, hashed)
+
+
+def get_password_hash(password):
+    return context().hash(password)
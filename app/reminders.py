@@ -0,0 +1,271 @@
+# app/reminders.py
+# Appointment reminders. Each upcoming appointment owns one row in reminder_jobs,
+# written in the same transaction as the appointment, so reminders survive
+# restarts. A scheduler thread keeps a heap of due times to know when to wake
+# up, then claims due jobs with a single conditional UPDATE (status
+# 'pending' -> 'claimed'), so with several workers every job goes to exactly one of
+# them. Claimed jobs go to the sender in batches; requests only write the job row.
+import heapq
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+from app import database
+from app.models import Appointment, Patient, ReminderJob
+from app.logger_config import get_logger
+
+logger = get_logger("clinic.reminders")
+
+REMINDER_OFFSET = timedelta(minutes=float(os.getenv("REMINDER_OFFSET_MINUTES", str(24 * 60))))
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "100"))
+REMINDER_POLL_SECONDS = float(os.getenv("REMINDER_POLL_SECONDS", "30"))
+REMINDER_LEASE_SECONDS = float(os.getenv("REMINDER_LEASE_SECONDS", "300"))  # reclaim after a crash
+REMINDER_MAX_ATTEMPTS = int(os.getenv("REMINDER_MAX_ATTEMPTS", "5"))
+REMINDER_RETRY_SECONDS = float(os.getenv("REMINDER_RETRY_SECONDS", "60"))
+REMINDERS_ENABLED = os.getenv("REMINDERS_ENABLED", "1").lower() in ("1", "true", "yes")
+
+# a sender gets one batch of reminder dicts and returns the job ids that failed (or None)
+Sender = Callable[[List[dict]], Optional[Iterable[int]]]
+
+
+def naive_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def due_time(scheduled_at: datetime) -> datetime:
+    return naive_utc(scheduled_at) - REMINDER_OFFSET
+
+
+def schedule_reminder(db: Session, appt: Appointment) -> Tuple[int, Optional[datetime]]:
+    """
+    Create or move the reminder for `appt` inside the caller's transaction.
+    Returns (job id, due time), with due time None when no reminder should fire.
+    The caller commits and then passes the pair to reminder_scheduler.notify.
+    """
+    job = db.query(ReminderJob).filter(ReminderJob.appointment_id == appt.id).first()
+    if job is None:
+        job = ReminderJob(appointment_id=appt.id, attempts=0)
+        db.add(job)
+    upcoming = appt.status == "scheduled" and naive_utc(appt.scheduled_at) > datetime.utcnow()
+    job.due_at = due_time(appt.scheduled_at)
+    job.status = "pending" if upcoming else "canceled"
+    job.attempts, job.claimed_by, job.claimed_at, job.last_error = 0, None, None, None
+    db.flush()
+    return job.id, job.due_at if upcoming else None
+
+
+def cancel_reminder(db: Session, appointment_id: int):
+    """Withdraw an appointment's reminder inside the caller's transaction."""
+    db.execute(update(ReminderJob)
+               .where(ReminderJob.appointment_id == appointment_id,
+                      ReminderJob.status.in_(("pending", "claimed")))
+               .values(status="canceled"))
+
+
+def log_sender(batch: List[dict]) -> None:
+    # placeholder transport: plug an SMS/email provider (Twilio/SendGrid) in here
+    for r in batch:
+        logger.info("Reminder to %s (%s) about appointment %s at %s",
+                    r["first_name"], r["phone"] or r["email"], r["appointment_id"], r["scheduled_at"])
+
+
+class ReminderScheduler:
+    def __init__(self, sender: Sender = log_sender, batch_size: int = REMINDER_BATCH_SIZE,
+                 poll_interval: float = REMINDER_POLL_SECONDS, lease: float = REMINDER_LEASE_SECONDS,
+                 worker_id: Optional[str] = None):
+        self.sender = sender
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease = timedelta(seconds=lease)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._heap: List[Tuple[datetime, int]] = []
+        self._due: Dict[int, datetime] = {}  # job id -> current due time; older heap entries are stale
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def notify(self, job_id: int, due_at: Optional[datetime]):
+        """Record a job's new due time (None = withdrawn), waking the loop if it is now first."""
+        with self._cond:
+            if due_at is None:
+                self._due.pop(job_id, None)
+                return
+            self._due[job_id] = due_at
+            heapq.heappush(self._heap, (due_at, job_id))
+            if self._heap[0] == (due_at, job_id):
+                self._cond.notify()
+
+    def _next_due(self) -> Optional[datetime]:
+        # caller holds the lock; drop entries superseded by a later notify
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def refill(self, db: Session):
+        """
+        Pick up jobs due within the next poll window, including other workers' writes:
+        pending jobs at their due time, and claimed ones whose worker died at the time
+        their lease lapses, so a reclaim doesn't wait for some other job to come due.
+        """
+        horizon = datetime.utcnow() + timedelta(seconds=self.poll_interval)
+        rows = db.execute(select(ReminderJob.id, ReminderJob.due_at)
+                          .where(ReminderJob.status == "pending", ReminderJob.due_at <= horizon)).all()
+        rows += [(job_id, claimed_at + self.lease) for job_id, claimed_at in db.execute(
+            select(ReminderJob.id, ReminderJob.claimed_at)
+            .where(ReminderJob.status == "claimed", ReminderJob.claimed_at <= horizon - self.lease))]
+        for job_id, due_at in rows:
+            if self._due.get(job_id) != due_at:
+                self.notify(job_id, due_at)
+
+    def backfill(self, db: Session) -> int:
+        """Give upcoming appointments created before reminder_jobs existed their job."""
+        appts = (db.query(Appointment)
+                 .outerjoin(ReminderJob, ReminderJob.appointment_id == Appointment.id)
+                 .filter(ReminderJob.id.is_(None), Appointment.status == "scheduled",
+                         Appointment.scheduled_at > datetime.utcnow())
+                 .all())
+        for a in appts:
+            schedule_reminder(db, a)
+        db.commit()
+        if appts:
+            logger.info("Backfilled %s reminder jobs", len(appts))
+        return len(appts)
+
+    def claim(self, db: Session, now: datetime) -> List[int]:
+        """
+        Atomically claim up to batch_size due jobs for this worker. Every claim
+        counts as an attempt, including a reclaimed lease (its worker died mid-send);
+        a lapsed lease that already used REMINDER_MAX_ATTEMPTS fails instead.
+        """
+        lapsed = and_(ReminderJob.status == "claimed", ReminderJob.claimed_at <= now - self.lease)
+        db.execute(update(ReminderJob)
+                   .where(lapsed, ReminderJob.attempts >= REMINDER_MAX_ATTEMPTS)
+                   .values(status="failed", claimed_by=None, last_error="lease lapsed on the last attempt"))
+        claimable = or_(
+            and_(ReminderJob.status == "pending", ReminderJob.due_at <= now),
+            and_(lapsed, ReminderJob.attempts < REMINDER_MAX_ATTEMPTS),
+        )
+        due = (select(ReminderJob.id).where(claimable)
+               .order_by(ReminderJob.due_at).limit(self.batch_size).scalar_subquery())
+        ids = db.scalars(update(ReminderJob)
+                         .where(ReminderJob.id.in_(due), claimable)
+                         .values(status="claimed", claimed_by=self.worker_id, claimed_at=now,
+                                 attempts=ReminderJob.attempts + 1)
+                         .returning(ReminderJob.id)).all()
+        db.commit()
+        return ids
+
+    def _load(self, db: Session, ids: List[int]) -> List[dict]:
+        rows = db.execute(
+            select(ReminderJob.id, ReminderJob.attempts, Appointment.id, Appointment.scheduled_at,
+                   Appointment.reason, Patient.first_name, Patient.phone, Patient.email)
+            .join(Appointment, Appointment.id == ReminderJob.appointment_id)
+            .join(Patient, Patient.id == Appointment.patient_id)
+            .where(ReminderJob.id.in_(ids))
+        ).all()
+        keys = ("job_id", "attempts", "appointment_id", "scheduled_at", "reason", "first_name", "phone", "email")
+        return [dict(zip(keys, r)) for r in rows]
+
+    def _finish(self, db: Session, batch: List[dict], failed: set, now: datetime):
+        mine = and_(ReminderJob.status == "claimed", ReminderJob.claimed_by == self.worker_id)
+        sent = [r["job_id"] for r in batch if r["job_id"] not in failed]
+        if sent:
+            # a reschedule/cancel during the send reset the row; leave that version alone
+            db.execute(update(ReminderJob).where(ReminderJob.id.in_(sent), mine)
+                       .values(status="sent", sent_at=now))
+        for r in batch:
+            if r["job_id"] not in failed:
+                continue
+            give_up = r["attempts"] >= REMINDER_MAX_ATTEMPTS
+            retry_at = now + timedelta(seconds=REMINDER_RETRY_SECONDS * r["attempts"])
+            db.execute(update(ReminderJob).where(ReminderJob.id == r["job_id"], mine)
+                       .values(status="failed" if give_up else "pending", due_at=retry_at,
+                               claimed_by=None, last_error="sender reported failure"))
+            if not give_up:
+                self.notify(r["job_id"], retry_at)
+        db.commit()
+
+    def run_once(self, now: Optional[datetime] = None) -> int:
+        """Claim and send every job due at `now`, batch by batch. Returns reminders sent."""
+        now = now or datetime.utcnow()
+        with self._cond:
+            while self._next_due() is not None and self._heap[0][0] <= now:
+                _, job_id = heapq.heappop(self._heap)
+                self._due.pop(job_id, None)
+        sent = 0
+        db = database.SessionLocal()
+        try:
+            while True:
+                ids = self.claim(db, now)
+                if not ids:
+                    break
+                batch = self._load(db, ids)
+                try:
+                    failed = set(self.sender(batch) or ())
+                except Exception:
+                    logger.exception("Reminder sender failed for %s jobs", len(batch))
+                    failed = {r["job_id"] for r in batch}
+                self._finish(db, batch, failed, now)
+                sent += len(batch) - len(failed)
+                if len(ids) < self.batch_size:
+                    break
+        finally:
+            db.close()
+        if sent:
+            logger.info("Sent %s reminders", sent)
+        return sent
+
+    def _loop(self):
+        next_refill = 0.0
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() >= next_refill:
+                    db = database.SessionLocal()
+                    try:
+                        self.refill(db)
+                    finally:
+                        db.close()
+                    next_refill = time.monotonic() + self.poll_interval
+                with self._cond:
+                    nxt = self._next_due()
+                    wait = next_refill - time.monotonic()
+                    if nxt is not None:
+                        wait = min(wait, (nxt - datetime.utcnow()).total_seconds())
+                    if wait > 0:
+                        self._cond.wait(wait)
+                        continue
+                self.run_once()
+            except Exception:
+                logger.exception("Reminder loop iteration failed")
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        db = database.SessionLocal()
+        try:
+            self.backfill(db)
+        finally:
+            db.close()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="reminders", daemon=True)
+        self._thread.start()
+        logger.info("Reminder scheduler started worker=%s offset=%s", self.worker_id, REMINDER_OFFSET)
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        with self._cond:
+            self._cond.notify()
+        self._thread.join(timeout=5)
+        self._thread = None
+
+
+reminder_scheduler = ReminderScheduler()
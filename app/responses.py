@@ -0,0 +1,85 @@
+# app/responses.py
+# Pre-serialized JSON responses for the cached read paths. A body is encoded once
+# with pydantic-core's Rust serializer (TypeAdapter.dump_json, the encoder behind
+# FastAPI's own response_model fast path), cached as bytes, and a hit is returned
+# as a Response as-is: no json.loads, no response_model validation, no re-encode.
+#
+# The same reads carry strong ETags built from cache namespace generations (which
+# writers already bump), so a client polling with If-None-Match gets a 304 decided
+# from the generation alone, before any ORM load or cache lookup. Only generations
+# shared through Redis (cache.shared_generation) are used: a process-local one
+# differs between workers and misses their writes, so without Redis no ETag is sent.
+import os
+from functools import lru_cache
+from typing import Any, Optional, Tuple, Union
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+
+class JSONBytesResponse(Response):
+    media_type = "application/json"
+
+
+@lru_cache(maxsize=None)
+def adapter(tp) -> TypeAdapter:
+    return TypeAdapter(tp)
+
+
+def encode(tp, obj: Any) -> bytes:
+    """Validate `obj` (ORM objects allowed) as `tp` and serialize it to JSON bytes."""
+    a = adapter(tp)
+    return a.dump_json(a.validate_python(obj, from_attributes=True))
+
+
+# cache entries carry the next-page cursor in front of the body: "<cursor>\n<json>".
+# Compact JSON never contains a raw newline, so the first one is the separator.
+def pack(body: bytes, next_cursor: Optional[str] = None) -> bytes:
+    return (next_cursor or "").encode() + b"\n" + body
+
+
+def unpack(raw: Union[bytes, str]) -> Tuple[bytes, Optional[str]]:
+    if isinstance(raw, str):  # Redis hands back decoded text
+        raw = raw.encode()
+    head, _, body = raw.partition(b"\n")
+    return body, head.decode() or None
+
+
+# records are personal data: shared caches must not store them, and clients revalidate
+CACHE_CONTROL = os.getenv("HTTP_CACHE_CONTROL", "private, no-cache")
+
+
+def etag(*parts, gen: Optional[int]) -> Optional[str]:
+    """
+    Strong validator from the parts that version a representation plus the shared
+    generation, e.g. etag("patient", 7, gen=g). None (send no ETag) when `gen` is None.
+    """
+    if gen is None:
+        return None
+    return '"' + "-".join(map(str, (*parts, gen))) + '"'
+
+
+def not_modified(request: Request, tag: Optional[str], exists: bool = False) -> Optional[Response]:
+    """
+    A 304 when If-None-Match matches `tag` (weak comparison, as RFC 9110 asks for GET),
+    else None. "*" matches any current representation, so it only counts once the
+    caller knows the resource exists (`exists`); a missing one still gets its 404.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    candidates = {c.strip().removeprefix("W/") for c in header.split(",")}
+    if (exists and "*" in candidates) or (tag and tag in candidates):
+        headers = {"Cache-Control": CACHE_CONTROL}
+        if tag:
+            headers["ETag"] = tag
+        return Response(status_code=304, headers=headers)
+    return None
+
+
+def json_response(body: bytes, next_cursor: Optional[str] = None, tag: Optional[str] = None) -> JSONBytesResponse:
+    headers = {"Cache-Control": CACHE_CONTROL}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if tag:
+        headers["ETag"] = tag
+    return JSONBytesResponse(body, headers=headers)
@@ -0,0 +1,111 @@
+# app/revocation.py
+# Token revocation, checked by get_current_user on every authenticated request.
+# The database is the source of truth: revoked token ids (jti) in revoked_tokens,
+# per-user cutoffs ("tokens issued before T") in token_cutoffs, so a revocation
+# holds on every worker and across restarts. Each worker keeps an in-process copy,
+# so the check is a dict lookup. Every REVOCATION_SYNC_SECONDS a worker reads the
+# version counter Redis keeps and reloads the tables only when it moved; without
+# Redis (or with the circuit open) it reloads them on every sync. A worker's own
+# revocations apply at once; other workers' within the sync interval.
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from app import database
+from app.cache import cache as default_cache
+from app.models import RevokedToken, TokenCutoff
+from app.logger_config import get_logger
+
+logger = get_logger("clinic.revocation")
+
+SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "1"))
+
+
+class RevocationList:
+    def __init__(self, cache, sync_seconds: float = SYNC_SECONDS,
+                 session_factory: Optional[Callable[[], Session]] = None):
+        self.cache = cache
+        self.sync_seconds = sync_seconds
+        # looked up per call, so a reconfigured database.SessionLocal is honoured
+        self.session_factory = session_factory or (lambda: database.SessionLocal())
+        self._tokens: Dict[str, float] = {}  # jti -> expiry (epoch seconds)
+        self._users: Dict[str, float] = {}   # username -> cutoff (epoch seconds)
+        self._version: Optional[int] = None
+        self._synced = float("-inf")  # monotonic time of the last sync
+        self._lock = threading.Lock()
+
+    def revoke_token(self, db: Session, jti: str, exp: float):
+        """Record a logged-out token in `db` (committed here), then tell the other workers."""
+        now = time.time()
+        db.execute(delete(RevokedToken).where(RevokedToken.exp <= now))  # lapsed tokens fail anyway
+        db.merge(RevokedToken(jti=jti, exp=exp))
+        db.commit()
+        with self._lock:
+            self._tokens[jti] = exp
+        self.cache.bump_revocations()
+        logger.info("Revoked token %s", jti)
+
+    def revoke_user(self, db: Session, username: str, before: Optional[float] = None):
+        """Revoke every token of `username` issued before `before` (default: now)."""
+        before = before or time.time()
+        row = db.get(TokenCutoff, username)
+        if row is None:
+            db.add(TokenCutoff(username=username, issued_before=before))
+        else:
+            row.issued_before = max(row.issued_before, before)
+        db.commit()
+        with self._lock:
+            self._users[username] = max(self._users.get(username, 0.0), before)
+        self.cache.bump_revocations()
+        logger.info("Revoked tokens of %s issued before %s", username, before)
+
+    def is_revoked(self, jti: Optional[str], username: str, issued_at: Optional[float]) -> bool:
+        self.sync()
+        if jti in self._tokens:
+            return True
+        cutoff = self._users.get(username)
+        return cutoff is not None and (issued_at or 0.0) < cutoff
+
+    def _load(self) -> Optional[Tuple[Dict[str, float], Dict[str, float]]]:
+        try:
+            with self.session_factory() as db:
+                tokens = db.execute(select(RevokedToken.jti, RevokedToken.exp)
+                                    .where(RevokedToken.exp > time.time())).all()
+                users = db.execute(select(TokenCutoff.username, TokenCutoff.issued_before)).all()
+        except Exception as e:
+            logger.error("Revocation load error: %s", e)
+            return None
+        return dict(tokens), dict(users)
+
+    def sync(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._synced < self.sync_seconds:
+            return
+        # one thread refreshes; the others keep answering from the current lists
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._synced = now
+            wall = time.time()
+            self._tokens = {j: e for j, e in self._tokens.items() if e > wall}  # expired tokens fail anyway
+            # read the version first: a revocation racing the load moves it again
+            version = self.cache.revocation_version()
+            if version is not None and version == self._version:
+                return
+            loaded = self._load()
+            if loaded is None:
+                return
+            tokens, users = loaded
+            # revocations are never undone, so merging keeps local ones the load raced with
+            merged = dict(self._tokens)
+            merged.update(tokens)
+            for u, t in self._users.items():
+                users[u] = max(users.get(u, 0.0), t)
+            self._tokens, self._users, self._version = merged, users, version
+        finally:
+            self._lock.release()
+
+
+revocations = RevocationList(default_cache)
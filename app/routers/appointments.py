@@ -1,39 +1,39 @@
 # app/routers/appointments.py
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.services.appointment_service import AppointmentService
-from app.schemas import AppointmentCreate, AppointmentOut
+from app.schemas import AppointmentCreate, AppointmentOut, SlotWindow
 from app.auth import require_roles
+from app.slots import SLOT_MINUTES, SlotUnavailable
+from app.export import export_response
+from app.models import Appointment
 from typing import List
-from datetime import datetime
+from datetime import date, datetime
 
 router = APIRouter(prefix="/appointments", tags=["appointments"])
 
 
-def send_reminder_stub(patient_phone: str, when: datetime):
-    # stub: integrate with SMS/email provider (Twilio/SendGrid)
-    print(f"Reminder would be sent to {patient_phone} about appointment at {when}")
-
-
 @router.post("", response_model=AppointmentOut, status_code=201, dependencies=[Depends(require_roles("doctor","nurse","admin","staff"))])
-def create_appointment(payload: AppointmentCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+def create_appointment(payload: AppointmentCreate, db: Session = Depends(get_db)):
     svc = AppointmentService(db)
     try:
         appt = svc.create(payload)
+    except SlotUnavailable as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError:
         raise HTTPException(status_code=404, detail="Patient not found")
-    # schedule reminder as background task (example: send 24 hours before)
-    # In real app you'd calculate when and use a scheduler (Celery/Redis/APS)
-    # Here we just schedule a simple background task run immediately for demo
-    background_tasks.add_task(send_reminder_stub, "patient-phone-placeholder", appt.scheduled_at)
+    # the service queued the reminder job; reminders.py sends it before scheduled_at
     return appt
 
 
 @router.patch("/{appointment_id}/reschedule", response_model=AppointmentOut, dependencies=[Depends(require_roles("doctor","admin"))])
 def reschedule(appointment_id: int, new_time: datetime, db: Session = Depends(get_db)):
     svc = AppointmentService(db)
-    appt = svc.reschedule(appointment_id, new_time)
+    try:
+        appt = svc.reschedule(appointment_id, new_time)
+    except SlotUnavailable as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if not appt:
         raise HTTPException(status_code=404, detail="Appointment not found")
     return appt
@@ -49,8 +49,23 @@ def cancel(appointment_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("", response_model=List[AppointmentOut], dependencies=[Depends(require_roles("doctor","nurse","admin","staff"))])
-def list_appointments(page: int = Query(1, ge=1), status: str | None = None, db: Session = Depends(get_db)):
-    per_page = 10
-    skip = (page-1)*per_page
+def list_appointments(response: Response, page: int = Query(1, ge=1), cursor: str | None = None,
+                      status: str | None = None, db: Session = Depends(get_db)):
     svc = AppointmentService(db)
-    return svc.list(skip=skip, limit=per_page, status=status)
+    try:
+        results, nxt = svc.page(page=page, cursor=cursor, status=status)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if nxt:
+        response.headers["X-Next-Cursor"] = nxt
+    return results
+
+
+@router.get("/availability", response_model=List[SlotWindow], dependencies=[Depends(require_roles("doctor","nurse","admin","staff"))])
+def availability(date: date, duration: int = Query(SLOT_MINUTES, ge=1, le=24 * 60), db: Session = Depends(get_db)):
+    return AppointmentService(db).availability(date, duration)
+
+
+@router.get("/export", dependencies=[Depends(require_roles("admin","doctor"))])
+def export_appointments(format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    return export_response(Appointment, format)
@@ -0,0 +1,57 @@
+# app/routers/async_appointments.py
+# Async-mode (DB_ASYNC=1) versions of the appointment routes; see async_patients.py.
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from app.database import get_async_db
+from app.services.appointment_service import AsyncAppointmentService
+from app.schemas import AppointmentCreate, AppointmentOut
+from app.auth import require_roles
+from app.slots import SlotUnavailable
+from typing import List
+from datetime import datetime
+
+router = APIRouter(prefix="/appointments", tags=["appointments"])
+
+
+@router.post("", response_model=AppointmentOut, status_code=201, dependencies=[Depends(require_roles("doctor","nurse","admin","staff"))])
+async def create_appointment(payload: AppointmentCreate, db=Depends(get_async_db)):
+    svc = AsyncAppointmentService(db)
+    try:
+        return await svc.create(payload)
+    except SlotUnavailable as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Patient not found")
+
+
+@router.patch("/{appointment_id:int}/reschedule", response_model=AppointmentOut, dependencies=[Depends(require_roles("doctor","admin"))])
+async def reschedule(appointment_id: int, new_time: datetime, db=Depends(get_async_db)):
+    svc = AsyncAppointmentService(db)
+    try:
+        appt = await svc.reschedule(appointment_id, new_time)
+    except SlotUnavailable as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not appt:
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    return appt
+
+
+@router.patch("/{appointment_id:int}/cancel", response_model=AppointmentOut, dependencies=[Depends(require_roles("doctor","nurse","admin","staff"))])
+async def cancel(appointment_id: int, db=Depends(get_async_db)):
+    svc = AsyncAppointmentService(db)
+    appt = await svc.cancel(appointment_id)
+    if not appt:
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    return appt
+
+
+@router.get("", response_model=List[AppointmentOut], dependencies=[Depends(require_roles("doctor","nurse","admin","staff"))])
+async def list_appointments(response: Response, page: int = Query(1, ge=1), cursor: str | None = None,
+                            status: str | None = None, db=Depends(get_async_db)):
+    svc = AsyncAppointmentService(db)
+    try:
+        results, nxt = await svc.page(page=page, cursor=cursor, status=status)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if nxt:
+        response.headers["X-Next-Cursor"] = nxt
+    return results
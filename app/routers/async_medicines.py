@@ -0,0 +1,74 @@
+# app/routers/async_medicines.py
+# Async-mode (DB_ASYNC=1) versions of the medicine routes; see async_patients.py.
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List
+from app.database import get_async_db
+from app.services.medicine_service import AsyncMedicineService
+from app.schemas import MedicineCreate, MedicineOut, StockAdjustment
+from app.auth import require_roles
+from app.cache import cache
+from app.responses import encode, etag, json_response, not_modified, pack, unpack
+
+router = APIRouter(prefix="/medicines", tags=["medicines"])
+
+
+@router.post("", response_model=MedicineOut, status_code=201, dependencies=[Depends(require_roles("admin","staff"))])
+async def add_medicine(payload: MedicineCreate, db=Depends(get_async_db)):
+    svc = AsyncMedicineService(db)
+    return await svc.create(payload)
+
+
+# :int keeps /medicines/suggest and friends on the sync router
+@router.get("/{medicine_id:int}", response_model=MedicineOut, dependencies=[Depends(require_roles("doctor","nurse","admin","staff"))])
+async def get_medicine(medicine_id: int, request: Request, db=Depends(get_async_db)):
+    # every medicine write bumps the "medicines" generation
+    tag = etag("medicine", medicine_id, gen=await cache.run(cache.shared_generation, "medicines"))
+    unchanged = not_modified(request, tag)
+    if unchanged:
+        return unchanged
+    svc = AsyncMedicineService(db)
+    m = await svc.get(medicine_id)
+    if not m:
+        raise HTTPException(status_code=404, detail="Medicine not found")
+    return not_modified(request, tag, exists=True) or json_response(encode(MedicineOut, m), tag=tag)
+
+
+@router.get("", response_model=List[MedicineOut], dependencies=[Depends(require_roles("doctor","nurse","admin","staff"))])
+async def search_medicines(request: Request, q: str | None = None, page: int = Query(1, ge=1),
+                           cursor: str | None = None, db=Depends(get_async_db)):
+    # validators are compared per URL, so q/cursor need not be part of the tag
+    tag = etag("medicines", gen=await cache.run(cache.shared_generation, "medicines"))
+    unchanged = not_modified(request, tag, exists=True)  # the collection always exists
+    if unchanged:
+        return unchanged
+    cache_key = await cache.run(cache.key, "medicines", "body", q or "", cursor or f"page:{page}")
+    cached = await cache.run(cache.get, cache_key)
+    if cached:
+        return json_response(*unpack(cached), tag=tag)
+    svc = AsyncMedicineService(db)
+    try:
+        res, nxt = await svc.page(page=page, cursor=cursor, q=q)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    body = encode(List[MedicineOut], res)
+    await cache.run(cache.set, cache_key, pack(body, nxt))
+    return json_response(body, nxt, tag)
+
+
+@router.patch("/{medicine_id:int}/adjust", response_model=MedicineOut, dependencies=[Depends(require_roles("admin","staff"))])
+async def adjust_medicine(medicine_id: int, delta: int = 0, db=Depends(get_async_db)):
+    svc = AsyncMedicineService(db)
+    m = await svc.adjust(medicine_id, delta)
+    if not m:
+        raise HTTPException(status_code=404, detail="Medicine not found")
+    return m
+
+
+@router.patch("/adjust-batch", response_model=List[MedicineOut], dependencies=[Depends(require_roles("admin","staff"))])
+async def adjust_medicines_batch(items: List[StockAdjustment], db=Depends(get_async_db)):
+    # a whole prescription in one transaction: all deltas apply or none do
+    svc = AsyncMedicineService(db)
+    try:
+        return await svc.adjust_batch((i.medicine_id, i.delta) for i in items)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
@@ -0,0 +1,54 @@
+# app/routers/async_patients.py
+# Async-mode (DB_ASYNC=1) versions of the hot patient routes. Mounted ahead of
+# app.routers.patients, so routes not defined here keep being served there.
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from app.database import get_async_db
+from app.services.patient_service import AsyncPatientService
+from app.schemas import PatientCreate, PatientOut
+from app.auth import require_roles
+from app.cache import cache
+from app.responses import encode, etag, json_response, not_modified, pack, unpack
+from typing import List
+
+router = APIRouter(prefix="/patients", tags=["patients"])
+
+
+@router.post("", response_model=PatientOut, status_code=201, dependencies=[Depends(require_roles("doctor","nurse","admin"))])
+async def create_patient(payload: PatientCreate, db=Depends(get_async_db)):
+    svc = AsyncPatientService(db)
+    return await svc.create(payload)
+
+
+# :int keeps literal sub-paths (/patients/export, ...) falling through to the sync router
+@router.get("/{patient_id:int}", response_model=PatientOut, dependencies=[Depends(require_roles("doctor","nurse","admin","staff"))])
+async def get_patient(patient_id: int, request: Request, db=Depends(get_async_db)):
+    ns = f"patient:{patient_id}"
+    # cache calls that may reach Redis go through cache.run, off the event loop
+    tag = etag("patient", patient_id, gen=await cache.run(cache.shared_generation, ns))
+    unchanged = not_modified(request, tag)
+    if unchanged:
+        return unchanged
+    cache_key = await cache.run(cache.key, ns, "body")
+    cached = await cache.run(cache.get, cache_key)
+    if cached:
+        return not_modified(request, tag, exists=True) or json_response(*unpack(cached), tag=tag)
+    svc = AsyncPatientService(db)
+    p = await svc.get(patient_id)
+    if not p:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    body = encode(PatientOut, p)
+    await cache.run(cache.set, cache_key, pack(body))
+    return not_modified(request, tag, exists=True) or json_response(body, tag=tag)
+
+
+@router.get("", response_model=List[PatientOut], dependencies=[Depends(require_roles("doctor","nurse","admin","staff"))])
+async def list_patients(response: Response, page: int = Query(1, ge=1), cursor: str | None = None,
+                        q: str | None = None, db=Depends(get_async_db)):
+    svc = AsyncPatientService(db)
+    try:
+        results, nxt = await svc.page(page=page, cursor=cursor, q=q)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if nxt:
+        response.headers["X-Next-Cursor"] = nxt
+    return results
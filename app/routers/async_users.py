@@ -0,0 +1,42 @@
+# app/routers/async_users.py
+# Async-mode (DB_ASYNC=1) versions of the login routes; see async_patients.py.
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
+from app.database import get_async_db
+from app.services.user_service import AsyncUserService
+from app.schemas import UserCreate, Token
+from app.auth import create_access_token, get_password_hash_async, verify_password_async, HashingOverloaded
+from app.routers.users import hashing_busy
+from app.logger_config import get_logger
+
+logger = get_logger("clinic.routes.users")
+router = APIRouter(prefix="/users", tags=["users"])
+
+
+@router.post("/create", status_code=201)
+async def create_user(payload: UserCreate, db=Depends(get_async_db)):
+    svc = AsyncUserService(db)
+    if await svc.get_by_username(payload.username):
+        raise HTTPException(status_code=400, detail="Username exists")
+    try:
+        hashed = await get_password_hash_async(payload.password)
+    except HashingOverloaded:
+        raise hashing_busy()
+    user = await svc.create(payload, hashed)
+    return {"id": user.id, "username": user.username, "role": user.role}
+
+
+@router.post("/token", response_model=Token)
+async def token(form_data: OAuth2PasswordRequestForm = Depends(), db=Depends(get_async_db)):
+    svc = AsyncUserService(db)
+    user = await svc.get_by_username(form_data.username)
+    try:
+        valid = user is not None and await verify_password_async(form_data.password, user.hashed_password)
+    except HashingOverloaded:
+        raise hashing_busy()
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect credentials")
+    access_token = await run_in_threadpool(create_access_token, data={"sub": user.username, "role": user.role})
+    logger.info("User %s logged in", user.username)
+    return {"access_token": access_token, "token_type": "bearer"}
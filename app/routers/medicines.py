@@ -1,13 +1,13 @@
 # app/routers/medicines.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
 from app.services.medicine_service import MedicineService
-from app.schemas import MedicineCreate, MedicineOut
+from app.schemas import MedicineCreate, MedicineOut, StockAdjustment, MedicineSuggestion
 from app.auth import require_roles
 from app.cache import cache
-import json
+from app.responses import encode, etag, json_response, not_modified, pack, unpack
 
 router = APIRouter(prefix="/medicines", tags=["medicines"])
 
@@ -15,38 +15,50 @@ router = APIRouter(prefix="/medicines", tags=["medicines"])
 @router.post("", response_model=MedicineOut, status_code=201, dependencies=[Depends(require_roles("admin","staff"))])
 def add_medicine(payload: MedicineCreate, db: Session = Depends(get_db)):
     svc = MedicineService(db)
-    m = svc.create(payload)
-    cache.set("medicines:invalidate", "1", ttl=1)
-    return m
+    return svc.create(payload)
+
+
+@router.get("/suggest", response_model=List[MedicineSuggestion], dependencies=[Depends(require_roles("doctor","nurse","admin","staff"))])
+def suggest_medicines(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=50), db: Session = Depends(get_db)):
+    # served from the in-process prefix index; no DB query, no per-keystroke cache keys
+    svc = MedicineService(db)
+    return svc.suggest(q, limit)
 
 
 @router.get("/{medicine_id}", response_model=MedicineOut, dependencies=[Depends(require_roles("doctor","nurse","admin","staff"))])
-def get_medicine(medicine_id: int, db: Session = Depends(get_db)):
+def get_medicine(medicine_id: int, request: Request, db: Session = Depends(get_db)):
+    # every medicine write bumps the "medicines" generation
+    tag = etag("medicine", medicine_id, gen=cache.shared_generation("medicines"))
+    unchanged = not_modified(request, tag)
+    if unchanged:
+        return unchanged
     svc = MedicineService(db)
     m = svc.get(medicine_id)
     if not m:
         raise HTTPException(status_code=404, detail="Medicine not found")
-    return m
+    return not_modified(request, tag, exists=True) or json_response(encode(MedicineOut, m), tag=tag)
 
 
 @router.get("", response_model=List[MedicineOut], dependencies=[Depends(require_roles("doctor","nurse","admin","staff"))])
-def search_medicines(q: str | None = None, page: int = Query(1, ge=1), db: Session = Depends(get_db)):
-    per_page = 10
-    skip = (page-1)*per_page
-    cache_key = f"medicines:search:{q or ''}:page:{page}"
+def search_medicines(request: Request, q: str | None = None, page: int = Query(1, ge=1),
+                     cursor: str | None = None, db: Session = Depends(get_db)):
+    # validators are compared per URL, so q/cursor need not be part of the tag
+    tag = etag("medicines", gen=cache.shared_generation("medicines"))
+    unchanged = not_modified(request, tag, exists=True)  # the collection always exists
+    if unchanged:
+        return unchanged
+    cache_key = cache.key("medicines", "body", q or "", cursor or f"page:{page}")
     cached = cache.get(cache_key)
     if cached:
-        return json.loads(cached)
+        return json_response(*unpack(cached), tag=tag)
     svc = MedicineService(db)
-    res = svc.search(q=q, skip=skip, limit=per_page)
-    out = [MedicineOut.from_orm(r).dict() for r in res]
-    cache.set(cache_key, out)
-    # log low stock
-    for r in res:
-        if r.quantity <= r.reorder_threshold:
-            # simple log; you can trigger notifications
-            pass
-    return out
+    try:
+        res, nxt = svc.page(page=page, cursor=cursor, q=q)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    body = encode(List[MedicineOut], res)
+    cache.set(cache_key, pack(body, nxt))
+    return json_response(body, nxt, tag)
 
 
 @router.patch("/{medicine_id}/adjust", response_model=MedicineOut, dependencies=[Depends(require_roles("admin","staff"))])
@@ -56,3 +68,13 @@ def adjust_medicine(medicine_id: int, delta: int = 0, db: Session = Depends(get_
     if not m:
         raise HTTPException(status_code=404, detail="Medicine not found")
     return m
+
+
+@router.patch("/adjust-batch", response_model=List[MedicineOut], dependencies=[Depends(require_roles("admin","staff"))])
+def adjust_medicines_batch(items: List[StockAdjustment], db: Session = Depends(get_db)):
+    # a whole prescription in one transaction: all deltas apply or none do
+    svc = MedicineService(db)
+    try:
+        return svc.adjust_batch((i.medicine_id, i.delta) for i in items)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
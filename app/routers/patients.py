@@ -1,13 +1,16 @@
 # app/routers/patients.py
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, Request, Response, UploadFile, File
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.services.patient_service import PatientService
-from app.schemas import PatientCreate, PatientOut
+from app.schemas import PatientCreate, PatientOut, PatientTimeline
+from app.services.patient_service import TIMELINE_PAGE_SIZE
 from app.auth import require_roles, get_current_user
 from app.cache import cache
+from app.export import export_response
+from app.models import Patient
+from app.responses import encode, etag, json_response, not_modified, pack, unpack
 from typing import List
-import json
 
 router = APIRouter(prefix="/patients", tags=["patients"])
 
@@ -15,32 +18,91 @@ router = APIRouter(prefix="/patients", tags=["patients"])
 @router.post("", response_model=PatientOut, status_code=201, dependencies=[Depends(require_roles("doctor","nurse","admin"))])
 def create_patient(payload: PatientCreate, db: Session = Depends(get_db)):
     svc = PatientService(db)
-    p = svc.create(payload)
-    # invalidate general patient list cache
-    cache.set("patients:invalidate", "1", ttl=1)
-    return p
+    return svc.create(payload)
+
+
+def bulk_format(file: UploadFile) -> str | None:
+    name = (file.filename or "").lower()
+    ctype = (file.content_type or "").lower()
+    if name.endswith(".csv") or "csv" in ctype:
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in ctype or "jsonl" in ctype:
+        return "ndjson"
+    return None
+
+
+@router.post("/bulk", dependencies=[Depends(require_roles("doctor","nurse","admin"))])
+def bulk_import_patients(file: UploadFile = File(...), format: str | None = Query(None, pattern="^(csv|ndjson)$"),
+                         db: Session = Depends(get_db)):
+    # the upload is spooled to disk by the multipart parser and read back row by row
+    fmt = format or bulk_format(file)
+    if not fmt:
+        raise HTTPException(status_code=400, detail="Unknown upload format; pass ?format=csv|ndjson")
+    svc = PatientService(db)
+    return svc.bulk_import(file.file, fmt)
+
+
+@router.get("/export", dependencies=[Depends(require_roles("admin","doctor"))])
+def export_patients(format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    return export_response(Patient, format)
 
 
 @router.get("/{patient_id}", response_model=PatientOut, dependencies=[Depends(require_roles("doctor","nurse","admin","staff"))])
-def get_patient(patient_id: int, db: Session = Depends(get_db)):
-    cache_key = f"patient:{patient_id}"
+def get_patient(patient_id: int, request: Request, db: Session = Depends(get_db)):
+    # patient:{id} is bumped by every write touching the patient, so its generation versions the body
+    ns = f"patient:{patient_id}"
+    tag = etag("patient", patient_id, gen=cache.shared_generation(ns))
+    unchanged = not_modified(request, tag)
+    if unchanged:
+        return unchanged
+    # the cache holds the encoded body; a hit goes out as-is
+    cache_key = cache.key(ns, "body")
     cached = cache.get(cache_key)
     if cached:
-        # cached is JSON string
-        return json.loads(cached)
+        return not_modified(request, tag, exists=True) or json_response(*unpack(cached), tag=tag)
     svc = PatientService(db)
     p = svc.get(patient_id)
     if not p:
         raise HTTPException(status_code=404, detail="Patient not found")
-    out = PatientOut.from_orm(p).dict()
-    cache.set(cache_key, out)
-    return out
+    body = encode(PatientOut, p)
+    cache.set(cache_key, pack(body))
+    return not_modified(request, tag, exists=True) or json_response(body, tag=tag)
+
+
+@router.get("/{patient_id}/timeline", response_model=PatientTimeline, dependencies=[Depends(require_roles("doctor","nurse","admin"))])
+def get_timeline(patient_id: int, request: Request, limit: int = Query(TIMELINE_PAGE_SIZE, ge=1, le=1000),
+                 cursor: str | None = None, db: Session = Depends(get_db)):
+    # appointment writes bump patient:{id}, so cached pages never outlive a change
+    ns = f"patient:{patient_id}"
+    tag = etag("timeline", patient_id, gen=cache.shared_generation(ns))
+    unchanged = not_modified(request, tag)
+    if unchanged:
+        return unchanged
+    cache_key = cache.key(ns, "timeline-body", limit, cursor or "")
+    cached = cache.get(cache_key)
+    if cached:
+        return not_modified(request, tag, exists=True) or json_response(*unpack(cached), tag=tag)
+    svc = PatientService(db)
+    try:
+        found = svc.timeline(patient_id, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not found:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    p, appts, nxt = found
+    body = encode(PatientTimeline, {"patient": p, "appointments": appts})
+    cache.set(cache_key, pack(body, nxt))
+    return not_modified(request, tag, exists=True) or json_response(body, nxt, tag)
 
 
 @router.get("", response_model=List[PatientOut], dependencies=[Depends(require_roles("doctor","nurse","admin","staff"))])
-def list_patients(page: int = Query(1, ge=1), q: str | None = None, db: Session = Depends(get_db)):
-    per_page = 10
-    skip = (page-1)*per_page
+def list_patients(response: Response, page: int = Query(1, ge=1), cursor: str | None = None,
+                  q: str | None = None, db: Session = Depends(get_db)):
     svc = PatientService(db)
-    results = svc.list(skip=skip, limit=per_page, q=q)
+    try:
+        results, nxt = svc.page(page=page, cursor=cursor, q=q)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if nxt:
+        response.headers["X-Next-Cursor"] = nxt
     return results
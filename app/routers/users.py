@@ -1,32 +1,71 @@
 # app/routers/users.py
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.services.user_service import UserService
-from app.schemas import UserCreate, Token
-from app.auth import create_access_token, get_db as auth_db_getter
+from app.schemas import UserCreate, Token, RoleUpdate
+from app.auth import (create_access_token, require_roles, get_db as auth_db_getter, get_current_user,
+                      oauth2_scheme, revoke_token, get_password_hash_async, verify_password_async, HashingOverloaded)
 from app.logger_config import get_logger
 
 logger = get_logger("clinic.routes.users")
 router = APIRouter(prefix="/users", tags=["users"])
 
 
+def hashing_busy():
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                         detail="Authentication busy, retry shortly", headers={"Retry-After": "1"})
+
+
+# async endpoints: bcrypt is awaited on the dedicated hashing pool and the quick
+# DB calls hop to the threadpool, so a login storm never holds request threads
 @router.post("/create", status_code=201)
-def create_user(payload: UserCreate, db: Session = Depends(get_db)):
+async def create_user(payload: UserCreate, db: Session = Depends(get_db)):
     svc = UserService(db)
-    if svc.get_by_username(payload.username):
+    if await run_in_threadpool(svc.get_by_username, payload.username):
         raise HTTPException(status_code=400, detail="Username exists")
-    user = svc.create(payload)
+    try:
+        hashed = await get_password_hash_async(payload.password)
+    except HashingOverloaded:
+        raise hashing_busy()
+    user = await run_in_threadpool(svc.create, payload, hashed)
     return {"id": user.id, "username": user.username, "role": user.role}
 
 
 @router.post("/token", response_model=Token)
-def token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     svc = UserService(db)
-    user = svc.authenticate(form_data.username, form_data.password)
-    if not user:
+    user = await run_in_threadpool(svc.get_by_username, form_data.username)
+    try:
+        valid = user is not None and await verify_password_async(form_data.password, user.hashed_password)
+    except HashingOverloaded:
+        raise hashing_busy()
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect credentials")
-    access_token = create_access_token(data={"sub": user.username, "role": user.role})
+    access_token = await run_in_threadpool(create_access_token, data={"sub": user.username, "role": user.role})
     logger.info("User %s logged in", user.username)
     return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.patch("/{username}/role", dependencies=[Depends(require_roles("admin"))])
+def update_role(username: str, payload: RoleUpdate, db: Session = Depends(get_db)):
+    svc = UserService(db)
+    user = svc.update_role(username, payload.role)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"id": user.id, "username": user.username, "role": user.role}
+
+
+@router.post("/logout", status_code=204, dependencies=[Depends(get_current_user)])
+def logout(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    revoke_token(db, token)
+
+
+@router.post("/{username}/revoke", status_code=204, dependencies=[Depends(require_roles("admin"))])
+def revoke_sessions(username: str, db: Session = Depends(get_db)):
+    # e.g. when staff leave or a device is lost; the user can log in again afterwards
+    svc = UserService(db)
+    if not svc.revoke_sessions(username):
+        raise HTTPException(status_code=404, detail="User not found")
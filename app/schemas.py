@@ -1,6 +1,6 @@
 # app/schemas.py
 from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 
 
@@ -42,6 +42,26 @@ class AppointmentOut(OrmBaseModel):
     created_at: datetime
 
 
+class StatusChange(OrmBaseModel):
+    status: str
+    scheduled_at: datetime
+    changed_at: datetime
+
+
+class TimelineAppointment(AppointmentOut):
+    history: List[StatusChange] = []
+
+
+class PatientTimeline(OrmBaseModel):
+    patient: PatientOut
+    appointments: List[TimelineAppointment]
+
+
+class SlotWindow(OrmBaseModel):
+    start: datetime
+    end: datetime
+
+
 # Medicines
 class MedicineCreate(OrmBaseModel):
     name: str
@@ -55,6 +75,18 @@ class MedicineOut(MedicineCreate):
     id: int
 
 
+class StockAdjustment(OrmBaseModel):
+    medicine_id: int
+    delta: int
+
+
+class MedicineSuggestion(OrmBaseModel):
+    id: int
+    name: str
+    quantity: int
+    reorder_threshold: int
+
+
 # Users & auth
 class UserCreate(OrmBaseModel):
     username: str
@@ -68,6 +100,16 @@ class Token(OrmBaseModel):
     token_type: str = "bearer"
 
 
+class Principal(OrmBaseModel):
+    # what get_current_user hands to routes: enough for RBAC, no DB row needed
+    username: str
+    role: str
+
+
+class RoleUpdate(OrmBaseModel):
+    role: Literal["admin", "doctor", "nurse", "staff"]
+
+
 class TokenData(OrmBaseModel):
     username: Optional[str] = None
     role: Optional[str] = None
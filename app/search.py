@@ -0,0 +1,174 @@
+# app/search.py
+# Lookup indexes.
+# Patients: an SQLite FTS5 shadow table (trigram tokenizer). The shadow table is an
+# external-content index over patients; triggers keep it in sync on
+# insert/update/delete, so every write path (ORM, bulk SQL) is covered.
+# Medicines: an in-process sorted array of names for keystroke-level autocomplete.
+import bisect
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import DDL, event, literal, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import column, table
+from app.cache import cache
+from app.models import Medicine, Patient
+from app.logger_config import get_logger
+
+logger = get_logger("clinic.search")
+
+FTS_TABLE = "patients_fts"
+MIN_TERM_LEN = 3  # trigram tokenizer cannot match anything shorter
+# bm25 scores move whenever the index changes, so ranked results page by offset
+# (a rank cursor would skip or repeat rows); the window bounds how deep that goes
+SEARCH_WINDOW = int(os.getenv("PATIENT_SEARCH_WINDOW", "500"))
+
+FTS_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "first_name, last_name, phone, content='patients', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON patients BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, first_name, last_name, phone) "
+    "VALUES (new.id, new.first_name, new.last_name, new.phone); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON patients BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, first_name, last_name, phone) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.phone); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON patients BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, first_name, last_name, phone) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.phone); "
+    f"INSERT INTO {FTS_TABLE}(rowid, first_name, last_name, phone) "
+    "VALUES (new.id, new.first_name, new.last_name, new.phone); END",
+]
+
+patients_fts = table(FTS_TABLE, column("rowid"), column("rank"))
+
+# fresh databases get the index together with the patients table
+for _stmt in FTS_DDL:
+    event.listen(Patient.__table__, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
+
+
+def ensure_patient_index(engine: Engine):
+    """
+    Create the FTS shadow table on an existing database and backfill it once.
+    Safe to call on every startup; a no-op for non-SQLite engines.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:n"), {"n": FTS_TABLE}
+        ).first()
+        for stmt in FTS_DDL:
+            conn.exec_driver_sql(stmt)
+        if not exists:
+            conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')")
+            logger.info("Built patient search index")
+
+
+def match_expression(q: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query: every term of 3+ chars must appear as a
+    substring of some column, which covers name prefixes and phone suffixes.
+    """
+    terms = [t for t in re.findall(r"\w+", q) if len(t) >= MIN_TERM_LEN]
+    if not terms:
+        return None
+    return " ".join(f'"{t}"' for t in terms)
+
+
+def is_ranked(db: Session, q: str) -> bool:
+    """Whether `q` goes through the FTS index (and is paged by offset) or the LIKE fallback."""
+    return match_expression(q) is not None and db.get_bind().dialect.name == "sqlite"
+
+
+def search_patients(db: Session, q: str, skip: int = 0, limit: int = 10,
+                    after_id: Optional[int] = None) -> List[Tuple[Patient, float]]:
+    """
+    Patient search; returns (patient, rank) pairs. Ranked (FTS) results are ordered
+    by (rank, id) and paged with `skip`; `after_id` only applies to the fallback.
+    """
+    if is_ranked(db, q):
+        rank = patients_fts.c.rank
+        qs = (db.query(Patient, rank)
+              .join(patients_fts, patients_fts.c.rowid == Patient.id)
+              .filter(text(f"{FTS_TABLE} MATCH :match")).params(match=match_expression(q))
+              .order_by(rank, Patient.id))
+    else:
+        # too short for trigrams (or no FTS): substring LIKE as before the index
+        # existed, unranked and in id order so the id keyset stays stable
+        like = f"%{q}%"
+        qs = db.query(Patient, literal(0.0)).filter(or_(
+            Patient.first_name.like(like), Patient.last_name.like(like), Patient.phone.like(like),
+        ))
+        if after_id is not None:
+            qs = qs.filter(Patient.id > after_id)
+        qs = qs.order_by(Patient.id)
+    rows = qs.offset(skip).limit(limit).all()
+    return [(p, float(r)) for p, r in rows]
+
+
+class MedicinePrefixIndex:
+    """
+    Sorted array of (lowercased name, id) answering prefix queries with bisect.
+    Each worker holds its own copy, built from the database and patched in place
+    by this worker's MedicineService writes. Like the slot index, it remembers the
+    generation of the "medicines" cache namespace it reflects; writes on other
+    workers bump it, and the next read rebuilds the index.
+    """
+    NAMESPACE = "medicines"
+
+    def __init__(self):
+        self._keys: List[Tuple[str, int]] = []
+        self._items: Dict[int, dict] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.generation: Optional[int] = None
+
+    def load(self, db: Session):
+        # read the generation first: a write racing the query bumps it again
+        gen = cache.generation(self.NAMESPACE)
+        rows = db.query(Medicine.id, Medicine.name, Medicine.quantity, Medicine.reorder_threshold).all()
+        items = {r.id: {"id": r.id, "name": r.name, "quantity": r.quantity,
+                        "reorder_threshold": r.reorder_threshold} for r in rows}
+        keys = sorted((it["name"].lower(), i) for i, it in items.items())
+        with self._lock:
+            self._items, self._keys, self.loaded, self.generation = items, keys, True, gen
+        logger.info("Built medicine prefix index entries=%s", len(keys))
+
+    def ensure_current(self, db: Session):
+        """Load on first use, and rebuild when another worker changed medicines."""
+        if not self.loaded or cache.generation(self.NAMESPACE) != self.generation:
+            self.load(db)
+
+    def upsert(self, m: Medicine):
+        """
+        Reflect a created or changed medicine; ignored until the index is loaded.
+        Call after invalidating "medicines": the index adopts the new generation.
+        """
+        if not self.loaded:
+            return
+        gen = cache.generation(self.NAMESPACE)
+        item = {"id": m.id, "name": m.name, "quantity": m.quantity, "reorder_threshold": m.reorder_threshold}
+        with self._lock:
+            old = self._items.get(m.id)
+            if old is not None and old["name"] != m.name:
+                self._keys.remove((old["name"].lower(), m.id))
+            if old is None or old["name"] != m.name:
+                bisect.insort(self._keys, (m.name.lower(), m.id))
+            self._items[m.id] = item
+            self.generation = gen
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[dict]:
+        p = prefix.lower()
+        with self._lock:
+            start = bisect.bisect_left(self._keys, (p,))
+            out = []
+            for name, mid in self._keys[start:start + limit]:
+                if not name.startswith(p):
+                    break
+                out.append(dict(self._items[mid]))
+        return out
+
+
+medicine_index = MedicinePrefixIndex()
@@ -1,9 +1,15 @@
 # app/services/appointment_service.py
-from app.services.base_service import BaseService
-from app.models import Appointment, Patient
+from app.services.base_service import BaseService, AsyncBaseService
+from app.models import Appointment, AppointmentStatusHistory, Patient
 from app.schemas import AppointmentCreate
-from typing import List, Optional
-from datetime import datetime
+from app.cache import cache
+from app.counters import counters, is_upcoming
+from app.pagination import decode_cursor, next_cursor
+from app.reminders import cancel_reminder, naive_utc, reminder_scheduler, schedule_reminder
+from app.slots import SlotUnavailable, check_slot, slot_index, slot_namespace
+from sqlalchemy import tuple_
+from typing import List, Optional, Tuple
+from datetime import date, datetime, timedelta
 
 
 class AppointmentService(BaseService):
@@ -12,38 +18,123 @@ class AppointmentService(BaseService):
         patient = self.db.query(Patient).filter(Patient.id == payload.patient_id).first()
         if not patient:
             raise ValueError("Patient not found")
-        a = Appointment(patient_id=payload.patient_id, scheduled_at=payload.scheduled_at, reason=payload.reason)
+        # stored, overlap-checked, indexed and reminded as naive UTC, whatever offset was sent
+        a = Appointment(patient_id=payload.patient_id, scheduled_at=naive_utc(payload.scheduled_at),
+                        reason=payload.reason)
         self.db.add(a)
+        self.db.flush()
+        self._check_slot(a)
+        self._record(a)
+        # the reminder job commits with the appointment; sending happens off-request
+        reminder = schedule_reminder(self.db, a)
         self.db.commit()
         self.db.refresh(a)
+        cache.invalidate("appointments", f"patient:{a.patient_id}", slot_namespace(a.scheduled_at))
+        slot_index.add(a.scheduled_at, a.id)
+        reminder_scheduler.notify(*reminder)
         self.logger.info("Created appointment id=%s", a.id)
+        counters.incr(upcoming_appointments=int(is_upcoming(a.status, a.scheduled_at)))
         return a
 
+    def _check_slot(self, a: Appointment):
+        """Overlap check on the flushed row, in this transaction (see slots.check_slot)."""
+        try:
+            check_slot(self.db, a)
+        except SlotUnavailable:
+            self.db.rollback()
+            raise
+
+    def _record(self, a: Appointment):
+        """Append the appointment's current state to its history (caller commits)."""
+        self.db.add(AppointmentStatusHistory(appointment_id=a.id, status=a.status or "scheduled",
+                                             scheduled_at=a.scheduled_at))
+
     def get(self, appointment_id: int) -> Optional[Appointment]:
         return self.db.query(Appointment).filter(Appointment.id == appointment_id).first()
 
-    def list(self, skip: int = 0, limit: int = 10, status: Optional[str] = None) -> List[Appointment]:
+    def list(self, skip: int = 0, limit: int = 10, status: Optional[str] = None,
+             after: Optional[Tuple[datetime, int]] = None) -> List[Appointment]:
         qs = self.db.query(Appointment)
         if status:
             qs = qs.filter(Appointment.status == status)
-        return qs.order_by(Appointment.scheduled_at).offset(skip).limit(limit).all()
+        if after is not None:
+            # keyset pagination on (scheduled_at, id); id breaks ties between equal times
+            qs = qs.filter(tuple_(Appointment.scheduled_at, Appointment.id) > tuple_(*after))
+        return qs.order_by(Appointment.scheduled_at, Appointment.id).offset(skip).limit(limit).all()
+
+    def page(self, page: int = 1, per_page: int = 10, cursor: Optional[str] = None,
+             status: Optional[str] = None) -> Tuple[List[Appointment], Optional[str]]:
+        """Like PatientService.page, keyed on (scheduled_at, id)."""
+        if cursor:
+            after = decode_cursor(cursor, datetime.fromisoformat, int)
+            results = self.list(limit=per_page, status=status, after=after)
+        else:
+            results = self.list(skip=(page-1)*per_page, limit=per_page, status=status)
+        return results, next_cursor(results, per_page, lambda a: (a.scheduled_at.isoformat(), a.id))
 
     def reschedule(self, appointment_id: int, new_time: datetime) -> Optional[Appointment]:
         a = self.get(appointment_id)
         if not a:
             return None
-        a.scheduled_at = new_time
+        was_upcoming = is_upcoming(a.status, a.scheduled_at)
+        old_time = a.scheduled_at
+        a.scheduled_at = new_time = naive_utc(new_time)
+        if a.status == "scheduled":
+            self.db.flush()
+            self._check_slot(a)
+        self._record(a)
+        reminder = schedule_reminder(self.db, a)
         self.db.commit()
         self.db.refresh(a)
+        cache.invalidate("appointments", f"patient:{a.patient_id}",
+                         slot_namespace(old_time), slot_namespace(a.scheduled_at))
+        if a.status == "scheduled":
+            slot_index.remove(old_time, a.id)
+            slot_index.add(a.scheduled_at, a.id)
+        reminder_scheduler.notify(*reminder)
         self.logger.info("Rescheduled appointment %s -> %s", appointment_id, new_time)
+        counters.incr(upcoming_appointments=int(is_upcoming(a.status, a.scheduled_at)) - int(was_upcoming))
         return a
 
     def cancel(self, appointment_id: int) -> Optional[Appointment]:
         a = self.get(appointment_id)
         if not a:
             return None
+        was_upcoming = is_upcoming(a.status, a.scheduled_at)
         a.status = "canceled"
+        self._record(a)
+        cancel_reminder(self.db, a.id)
         self.db.commit()
         self.db.refresh(a)
         self.logger.info("Canceled appointment %s", appointment_id)
+        cache.invalidate("appointments", f"patient:{a.patient_id}", slot_namespace(a.scheduled_at))
+        slot_index.remove(a.scheduled_at, a.id)
+        counters.incr(upcoming_appointments=-int(was_upcoming))
         return a
+
+    def availability(self, day: date, duration_minutes: int) -> List[dict]:
+        """Free windows on `day` long enough for `duration_minutes`, from the slot index."""
+        return slot_index.free_windows(self.db, day, timedelta(minutes=duration_minutes))
+
+
+class AsyncAppointmentService(AsyncBaseService):
+    service_class = AppointmentService
+
+    async def create(self, payload: AppointmentCreate) -> Appointment:
+        return await self._run("create", payload)
+
+    async def get(self, appointment_id: int) -> Optional[Appointment]:
+        return await self._run("get", appointment_id)
+
+    async def page(self, page: int = 1, per_page: int = 10, cursor: Optional[str] = None,
+                   status: Optional[str] = None) -> Tuple[List[Appointment], Optional[str]]:
+        return await self._run("page", page=page, per_page=per_page, cursor=cursor, status=status)
+
+    async def availability(self, day: date, duration_minutes: int) -> List[dict]:
+        return await self._run("availability", day, duration_minutes)
+
+    async def reschedule(self, appointment_id: int, new_time: datetime) -> Optional[Appointment]:
+        return await self._run("reschedule", appointment_id, new_time)
+
+    async def cancel(self, appointment_id: int) -> Optional[Appointment]:
+        return await self._run("cancel", appointment_id)
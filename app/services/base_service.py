@@ -9,3 +9,19 @@ class BaseService:
     def __init__(self, db: Session):
         self.db = db
         self.logger = logger
+
+
+class AsyncBaseService:
+    """
+    Async facade over a sync service. Calls run the sync service on the
+    AsyncSession's connection via run_sync, so DB IO is awaited on the event loop
+    while queries, cache invalidation and index upkeep stay in one implementation.
+    """
+    service_class = BaseService
+
+    def __init__(self, db):
+        self.db = db  # sqlalchemy.ext.asyncio.AsyncSession
+        self.logger = logger
+
+    async def _run(self, method: str, *args, **kwargs):
+        return await self.db.run_sync(lambda session: getattr(self.service_class(session), method)(*args, **kwargs))
@@ -1,8 +1,26 @@
 # app/services/medicine_service.py
-from app.services.base_service import BaseService
+from app.services.base_service import BaseService, AsyncBaseService
 from app.models import Medicine
 from app.schemas import MedicineCreate
-from typing import List, Optional
+from app.search import medicine_index
+from app.cache import cache
+from app.counters import counters, is_low_stock
+from app.pagination import decode_cursor, next_cursor
+from sqlalchemy import case, tuple_, update
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def adjust_stock_stmt(deltas: Dict[int, int]):
+    """
+    One conditional UPDATE ... RETURNING applying per-medicine deltas, clamped at
+    zero in SQL so concurrent adjustments can't lose updates.
+    """
+    delta = case(deltas, value=Medicine.id, else_=0)
+    new_qty = Medicine.quantity + delta
+    return (update(Medicine)
+            .where(Medicine.id.in_(list(deltas)))
+            .values(quantity=case((new_qty < 0, 0), else_=new_qty))
+            .returning(Medicine))
 
 
 class MedicineService(BaseService):
@@ -12,24 +30,108 @@ class MedicineService(BaseService):
         self.db.commit()
         self.db.refresh(m)
         self.logger.info("Created medicine id=%s", m.id)
+        cache.invalidate("medicines")
+        medicine_index.upsert(m)
+        counters.incr(low_stock_medicines=int(is_low_stock(m.quantity, m.reorder_threshold)))
         return m
 
     def get(self, medicine_id: int) -> Optional[Medicine]:
         return self.db.query(Medicine).filter(Medicine.id == medicine_id).first()
 
-    def search(self, q: Optional[str] = None, skip: int = 0, limit: int = 10) -> List[Medicine]:
+    def search(self, q: Optional[str] = None, skip: int = 0, limit: int = 10,
+               after: Optional[Tuple[str, int]] = None) -> List[Medicine]:
         qs = self.db.query(Medicine)
         if q:
             like = f"%{q}%"
             qs = qs.filter(Medicine.name.like(like))
-        return qs.order_by(Medicine.name).offset(skip).limit(limit).all()
+        if after is not None:
+            # keyset pagination on (name, id); id breaks ties between equal names
+            qs = qs.filter(tuple_(Medicine.name, Medicine.id) > tuple_(*after))
+        return qs.order_by(Medicine.name, Medicine.id).offset(skip).limit(limit).all()
+
+    def page(self, page: int = 1, per_page: int = 10, cursor: Optional[str] = None,
+             q: Optional[str] = None) -> Tuple[List[Medicine], Optional[str]]:
+        """Like PatientService.page, keyed on (name, id)."""
+        if cursor:
+            after = decode_cursor(cursor, str, int)
+            results = self.search(q=q, limit=per_page, after=after)
+        else:
+            results = self.search(q=q, skip=(page-1)*per_page, limit=per_page)
+        return results, next_cursor(results, per_page, lambda m: (m.name, m.id))
 
     def adjust(self, medicine_id: int, delta: int) -> Optional[Medicine]:
-        m = self.get(medicine_id)
+        m = self.db.scalars(adjust_stock_stmt({medicine_id: delta})).one_or_none()
         if not m:
+            self.db.rollback()
             return None
-        m.quantity = max(0, m.quantity + delta)
+        # detach so commit doesn't expire the RETURNING values (no refresh SELECT)
+        self.db.expunge(m)
         self.db.commit()
-        self.db.refresh(m)
         self.logger.info("Adjusted medicine %s by %s -> now %s", m.id, delta, m.quantity)
+        cache.invalidate("medicines")
+        medicine_index.upsert(m)
+        self._count_low_stock([(m, delta)])
         return m
+
+    def adjust_batch(self, items: Iterable[Tuple[int, int]]) -> List[Medicine]:
+        """
+        Apply (medicine_id, delta) pairs in one statement and one transaction.
+        Deltas for the same medicine are summed first. Raises ValueError (and
+        changes nothing) if any medicine does not exist.
+        """
+        deltas: Dict[int, int] = {}
+        for medicine_id, delta in items:
+            deltas[medicine_id] = deltas.get(medicine_id, 0) + delta
+        if not deltas:
+            return []
+        rows = self.db.scalars(adjust_stock_stmt(deltas)).all()
+        missing = set(deltas) - {m.id for m in rows}
+        if missing:
+            self.db.rollback()
+            raise ValueError(f"Medicine not found: {', '.join(map(str, sorted(missing)))}")
+        for m in rows:
+            self.db.expunge(m)
+        self.db.commit()
+        self.logger.info("Adjusted %s medicines in one batch", len(rows))
+        cache.invalidate("medicines")
+        for m in rows:
+            medicine_index.upsert(m)
+        self._count_low_stock([(m, deltas[m.id]) for m in rows])
+        return sorted(rows, key=lambda m: m.id)
+
+    def _count_low_stock(self, changes: List[Tuple[Medicine, int]]):
+        """Update the low-stock counter from post-UPDATE rows and the deltas applied."""
+        change = 0
+        for m, delta in changes:
+            if delta < 0 and m.quantity == 0:
+                # clamped at zero: the old quantity is unknown, let reconciliation recount
+                counters.mark_dirty()
+                return
+            before = is_low_stock(m.quantity - delta, m.reorder_threshold)
+            change += int(is_low_stock(m.quantity, m.reorder_threshold)) - int(before)
+        counters.incr(low_stock_medicines=change)
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[dict]:
+        """Autocomplete by name prefix from the in-memory index (rebuilt when medicines change elsewhere)."""
+        medicine_index.ensure_current(self.db)
+        return medicine_index.suggest(prefix, limit)
+
+
+class AsyncMedicineService(AsyncBaseService):
+    service_class = MedicineService
+
+    async def create(self, payload: MedicineCreate) -> Medicine:
+        return await self._run("create", payload)
+
+    async def get(self, medicine_id: int) -> Optional[Medicine]:
+        return await self._run("get", medicine_id)
+
+    async def page(self, page: int = 1, per_page: int = 10, cursor: Optional[str] = None,
+                   q: Optional[str] = None) -> Tuple[List[Medicine], Optional[str]]:
+        return await self._run("page", page=page, per_page=per_page, cursor=cursor, q=q)
+
+    async def adjust(self, medicine_id: int, delta: int) -> Optional[Medicine]:
+        return await self._run("adjust", medicine_id, delta)
+
+    async def adjust_batch(self, items: Iterable[Tuple[int, int]]) -> List[Medicine]:
+        return await self._run("adjust_batch", list(items))
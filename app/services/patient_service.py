@@ -1,8 +1,27 @@
 # app/services/patient_service.py
-from app.services.base_service import BaseService
-from app.models import Patient
+from app.services.base_service import BaseService, AsyncBaseService
+from app.models import Appointment, Patient
 from app.schemas import PatientCreate
-from typing import List, Optional
+from app import search
+from app.cache import cache
+from app.counters import counters
+from app.pagination import decode_cursor, encode_cursor, next_cursor
+from pydantic import ValidationError
+from sqlalchemy import insert, tuple_
+from sqlalchemy.orm import selectinload
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+import csv
+import io
+import json
+
+BULK_CHUNK_SIZE = 1000  # rows per executemany / transaction
+BULK_MAX_ERRORS = 100  # row errors echoed back in the report
+TIMELINE_PAGE_SIZE = 100  # appointments per timeline page, newest first
+
+
+class BulkFileError(Exception):
+    """The upload can't be read past some row (bad encoding, broken CSV); the import stops there."""
 
 
 class PatientService(BaseService):
@@ -12,14 +31,156 @@ class PatientService(BaseService):
         self.db.commit()
         self.db.refresh(p)
         self.logger.info("Created patient id=%s", p.id)
+        cache.invalidate("patients")
+        counters.incr(total_patients=1)
         return p
 
+    def bulk_import(self, fh: BinaryIO, fmt: str, chunk_size: int = BULK_CHUNK_SIZE) -> Dict:
+        """
+        Stream CSV (header row) or NDJSON from `fh`, validate each row against
+        PatientCreate and insert valid rows with one executemany per chunk, each
+        chunk in its own transaction. Returns a per-row error report; if the file
+        itself turns unreadable, rows before that point stay imported and the
+        report ends with the row reached and why.
+        """
+        inserted, failed, errors = 0, 0, []
+
+        def reject(row_no: int, error: str):
+            nonlocal failed
+            failed += 1
+            if len(errors) < BULK_MAX_ERRORS:
+                errors.append({"row": row_no, "error": error})
+
+        chunk: List[dict] = []
+        for row_no, record in self._bulk_records(fh, fmt):
+            if isinstance(record, BulkFileError):
+                failed += 1
+                errors.append({"row": row_no, "error": str(record)})  # always reported
+                break
+            if isinstance(record, Exception):
+                reject(row_no, str(record))
+                continue
+            try:
+                chunk.append(PatientCreate.model_validate(record).model_dump())
+            except ValidationError as e:
+                reject(row_no, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+                continue
+            if len(chunk) >= chunk_size:
+                inserted += self._bulk_insert(chunk)
+                chunk = []
+        inserted += self._bulk_insert(chunk)
+        self.logger.info("Bulk imported patients inserted=%s failed=%s", inserted, failed)
+        if inserted:
+            cache.invalidate("patients")
+        return {"inserted": inserted, "failed": failed, "errors": errors}
+
+    def _bulk_records(self, fh: BinaryIO, fmt: str) -> Iterator[Tuple[int, object]]:
+        text = io.TextIOWrapper(fh, encoding="utf-8-sig", newline="")
+        rows = csv.DictReader(text) if fmt == "csv" else text
+        row_no = 0
+        try:
+            for row_no, row in enumerate(rows, start=1):
+                if fmt == "csv":
+                    # empty cells mean "not provided"
+                    yield row_no, {k: (v if v != "" else None) for k, v in row.items() if k}
+                    continue
+                if not row.strip():
+                    continue
+                try:
+                    yield row_no, json.loads(row)
+                except ValueError as e:
+                    yield row_no, ValueError(f"invalid JSON: {e}")
+        except UnicodeDecodeError as e:
+            # decoding runs ahead in blocks, so the bad bytes are at or after this row
+            yield row_no + 1, BulkFileError(f"file is not valid UTF-8 from here on: {e.reason}")
+        except csv.Error as e:
+            yield row_no + 1, BulkFileError(f"malformed CSV: {e}")
+
+    def _bulk_insert(self, rows: List[dict]) -> int:
+        if not rows:
+            return 0
+        self.db.execute(insert(Patient), rows)
+        self.db.commit()
+        counters.incr(total_patients=len(rows))
+        return len(rows)
+
     def get(self, patient_id: int) -> Optional[Patient]:
         return self.db.query(Patient).filter(Patient.id == patient_id).first()
 
-    def list(self, skip: int = 0, limit: int = 10, q: Optional[str] = None) -> List[Patient]:
-        qs = self.db.query(Patient)
+    def list(self, skip: int = 0, limit: int = 10, q: Optional[str] = None, after_id: Optional[int] = None) -> List[Patient]:
         if q:
-            like = f"%{q}%"
-            qs = qs.filter((Patient.first_name.like(like)) | (Patient.last_name.like(like)) | (Patient.phone.like(like)))
+            return [p for p, _ in self.search(q, skip=skip, limit=limit)]
+        qs = self.db.query(Patient)
+        if after_id is not None:
+            # keyset pagination: seek past the last id seen instead of OFFSET
+            qs = qs.filter(Patient.id > after_id)
         return qs.order_by(Patient.id).offset(skip).limit(limit).all()
+
+    def search(self, q: str, skip: int = 0, limit: int = 10,
+               after_id: Optional[int] = None) -> List[Tuple[Patient, float]]:
+        """Patient search; returns (patient, rank) pairs (see search.search_patients)."""
+        return search.search_patients(self.db, q, skip=skip, limit=limit, after_id=after_id)
+
+    def page(self, page: int = 1, per_page: int = 10, cursor: Optional[str] = None,
+             q: Optional[str] = None) -> Tuple[List[Patient], Optional[str]]:
+        """
+        One page of patients plus the cursor of the next page (None on the last one).
+        A cursor wins over `page`; raises ValueError for a malformed cursor.
+        """
+        if q and search.is_ranked(self.db, q):
+            # ranked search: cursor is the offset of the next row, within SEARCH_WINDOW
+            (offset,) = decode_cursor(cursor, int) if cursor else ((page-1)*per_page,)
+            if offset < 0:
+                raise ValueError("Invalid cursor: negative offset")
+            limit = max(0, min(per_page, search.SEARCH_WINDOW - offset))
+            ranked = self.search(q, skip=offset, limit=limit) if limit else []
+            end = offset + len(ranked)
+            more = len(ranked) == per_page and end < search.SEARCH_WINDOW
+            return [p for p, _ in ranked], encode_cursor(end) if more else None
+        if q:
+            (after_id,) = decode_cursor(cursor, int) if cursor else (None,)
+            rows = self.search(q, skip=0 if cursor else (page-1)*per_page, limit=per_page, after_id=after_id)
+            return [p for p, _ in rows], next_cursor(rows, per_page, lambda row: (row[0].id,))
+        if cursor:
+            (after_id,) = decode_cursor(cursor, int)
+            results = self.list(limit=per_page, after_id=after_id)
+        else:
+            results = self.list(skip=(page-1)*per_page, limit=per_page)
+        return results, next_cursor(results, per_page, lambda p: (p.id,))
+
+    def timeline(self, patient_id: int, limit: int = TIMELINE_PAGE_SIZE,
+                 cursor: Optional[str] = None) -> Optional[Tuple[Patient, List[Appointment], Optional[str]]]:
+        """
+        A patient with one page of appointments (newest first) and each one's status
+        history, in three queries whatever the page size: patient, appointments, and
+        one selectin load of their history. Returns None for an unknown patient.
+        """
+        p = self.get(patient_id)
+        if not p:
+            return None
+        qs = (self.db.query(Appointment)
+              .filter(Appointment.patient_id == patient_id)
+              .options(selectinload(Appointment.history)))
+        if cursor:
+            after = decode_cursor(cursor, datetime.fromisoformat, int)
+            qs = qs.filter(tuple_(Appointment.scheduled_at, Appointment.id) < tuple_(*after))
+        appts = qs.order_by(Appointment.scheduled_at.desc(), Appointment.id.desc()).limit(limit).all()
+        return p, appts, next_cursor(appts, limit, lambda a: (a.scheduled_at.isoformat(), a.id))
+
+
+class AsyncPatientService(AsyncBaseService):
+    service_class = PatientService
+
+    async def create(self, payload: PatientCreate) -> Patient:
+        return await self._run("create", payload)
+
+    async def get(self, patient_id: int) -> Optional[Patient]:
+        return await self._run("get", patient_id)
+
+    async def page(self, page: int = 1, per_page: int = 10, cursor: Optional[str] = None,
+                   q: Optional[str] = None) -> Tuple[List[Patient], Optional[str]]:
+        return await self._run("page", page=page, per_page=per_page, cursor=cursor, q=q)
+
+    async def timeline(self, patient_id: int, limit: int = TIMELINE_PAGE_SIZE,
+                       cursor: Optional[str] = None) -> Optional[Tuple[Patient, List[Appointment], Optional[str]]]:
+        return await self._run("timeline", patient_id, limit=limit, cursor=cursor)
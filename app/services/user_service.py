@@ -1,14 +1,16 @@
 # app/services/user_service.py
-from app.services.base_service import BaseService
+from app.services.base_service import BaseService, AsyncBaseService
 from app.models import User
 from app.schemas import UserCreate
-from app.auth import get_password_hash, verify_password
+from app.auth import get_password_hash, verify_password, user_namespace
+from app.cache import cache
+from app.revocation import revocations
 from typing import Optional
 
 
 class UserService(BaseService):
-    def create(self, payload: UserCreate) -> User:
-        hashed = get_password_hash(payload.password)
+    def create(self, payload: UserCreate, hashed_password: Optional[str] = None) -> User:
+        hashed = hashed_password or get_password_hash(payload.password)
         u = User(username=payload.username, full_name=payload.full_name, role=payload.role, hashed_password=hashed)
         self.db.add(u)
         self.db.commit()
@@ -26,3 +28,34 @@ class UserService(BaseService):
         if not verify_password(password, u.hashed_password):
             return None
         return u
+
+    def update_role(self, username: str, role: str) -> Optional[User]:
+        u = self.get_by_username(username)
+        if not u:
+            return None
+        u.role = role
+        self.db.commit()
+        self.db.refresh(u)
+        self.logger.info("Changed role of %s to %s", u.username, u.role)
+        # drops every cached principal of this user on the next request
+        cache.invalidate(user_namespace(u.username))
+        return u
+
+    def revoke_sessions(self, username: str) -> Optional[User]:
+        """Sign the user out everywhere: every token issued until now stops working."""
+        u = self.get_by_username(username)
+        if not u:
+            return None
+        revocations.revoke_user(self.db, u.username)
+        self.logger.info("Revoked all sessions of %s", u.username)
+        return u
+
+
+class AsyncUserService(AsyncBaseService):
+    service_class = UserService
+
+    async def create(self, payload: UserCreate, hashed_password: Optional[str] = None) -> User:
+        return await self._run("create", payload, hashed_password)
+
+    async def get_by_username(self, username: str) -> Optional[User]:
+        return await self._run("get_by_username", username)
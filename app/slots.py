@@ -0,0 +1,151 @@
+# app/slots.py
+# Slots. Every appointment occupies a fixed slot of SLOT_MINUTES from scheduled_at.
+# Double-booking is prevented by check_slot, an indexed overlap query run inside
+# the write transaction, which is authoritative across threads, event loops and
+# workers. Free-slot search reads a per-day interval index of scheduled
+# appointments instead. A day's bucket is a sorted list of (start, appointment id) loaded
+# with one range query the first time the day is asked for. After that, this
+# worker's writes update it in place. Each bucket remembers the generation of
+# its cache namespace (slots:<date>), so writes from other workers, which bump
+# it, make the bucket reload.
+import bisect
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.cache import cache
+from app.models import Appointment
+from app.reminders import naive_utc
+from app.logger_config import get_logger
+
+logger = get_logger("clinic.slots")
+
+SLOT_MINUTES = int(os.getenv("APPOINTMENT_SLOT_MINUTES", "30"))
+CLINIC_OPEN = time.fromisoformat(os.getenv("CLINIC_OPEN", "09:00"))
+CLINIC_CLOSE = time.fromisoformat(os.getenv("CLINIC_CLOSE", "17:00"))
+SLOT_INDEX_DAYS = int(os.getenv("SLOT_INDEX_DAYS", "366"))  # buckets kept in memory
+SLOT_LOCK_CLASS = 0x510  # first key of PostgreSQL's two-key advisory locks taken per day
+
+
+class SlotUnavailable(Exception):
+    """The requested time overlaps another scheduled appointment."""
+
+    def __init__(self, conflict_id: int):
+        super().__init__(f"Slot overlaps appointment {conflict_id}")
+        self.conflict_id = conflict_id
+
+
+def slot_namespace(when) -> str:
+    """Cache namespace of the day bucket holding `when` (a date or a datetime)."""
+    day = naive_utc(when).date() if isinstance(when, datetime) else when
+    return f"slots:{day.isoformat()}"
+
+
+def check_slot(db: Session, appt: Appointment):
+    """
+    Raise SlotUnavailable if another scheduled appointment overlaps `appt`. Call it
+    after flushing the insert or update, before commit; the caller rolls back on
+    error. The flushed write holds SQLite's write lock, so the query sees every
+    committed booking and no other writer can commit until this transaction does.
+    Under PostgreSQL's READ COMMITTED two bookings still wouldn't see each other's
+    uncommitted rows. So first take a transaction-scoped advisory lock on every day
+    an overlapping slot could start on, in day order so that writers can't deadlock.
+    """
+    start = naive_utc(appt.scheduled_at)
+    slot = timedelta(minutes=SLOT_MINUTES)
+    if db.get_bind().dialect.name == "postgresql":
+        day = (start - slot).date()
+        while day <= (start + slot).date():
+            db.execute(select(func.pg_advisory_xact_lock(SLOT_LOCK_CLASS, day.toordinal())))
+            day += timedelta(days=1)
+    conflict = db.scalar(select(Appointment.id)
+                         .where(Appointment.status == "scheduled",
+                                Appointment.scheduled_at > start - slot,
+                                Appointment.scheduled_at < start + slot,
+                                Appointment.id != appt.id)
+                         .limit(1))
+    if conflict is not None:
+        raise SlotUnavailable(conflict)
+
+
+class DayIntervalIndex:
+    def __init__(self, slot_minutes: int = SLOT_MINUTES, max_days: int = SLOT_INDEX_DAYS):
+        self.slot = timedelta(minutes=slot_minutes)
+        self.max_days = max_days
+        self._days: "OrderedDict[date, Tuple[int, List[Tuple[datetime, int]]]]" = OrderedDict()
+        self.lock = threading.Lock()  # guards the buckets only; check_slot guards bookings
+
+    def _bucket(self, db: Session, day: date) -> List[Tuple[datetime, int]]:
+        gen = cache.generation(slot_namespace(day))
+        with self.lock:
+            entry = self._days.get(day)
+            if entry is not None and entry[0] == gen:
+                self._days.move_to_end(day)
+                return entry[1]
+        start = datetime.combine(day, time.min)
+        rows = (db.query(Appointment.scheduled_at, Appointment.id)
+                .filter(Appointment.status == "scheduled",
+                        Appointment.scheduled_at >= start, Appointment.scheduled_at < start + timedelta(days=1))
+                .all())
+        bucket = sorted((naive_utc(s), i) for s, i in rows)
+        with self.lock:
+            self._days[day] = (gen, bucket)
+            self._days.move_to_end(day)
+            while len(self._days) > self.max_days:
+                self._days.popitem(last=False)
+        return bucket
+
+    def _busy(self, db: Session, start: datetime, end: datetime) -> List[Tuple[datetime, int]]:
+        """Appointments whose slot intersects [start, end), in start order."""
+        out = []
+        day = (start - self.slot).date()
+        while day <= end.date():
+            bucket = self._bucket(db, day)
+            lo = bisect.bisect_right(bucket, (start - self.slot, float("inf")))
+            hi = bisect.bisect_left(bucket, (end,))
+            out.extend(bucket[lo:hi])
+            day += timedelta(days=1)
+        return out
+
+    def free_windows(self, db: Session, day: date, duration: timedelta) -> List[Dict[str, datetime]]:
+        """Gaps of at least `duration` between opening and closing time on `day`."""
+        opens, closes = datetime.combine(day, CLINIC_OPEN), datetime.combine(day, CLINIC_CLOSE)
+        windows, cursor = [], opens
+        for s, _ in self._busy(db, opens, closes):
+            if s - cursor >= duration:
+                windows.append({"start": cursor, "end": s})
+            cursor = max(cursor, s + self.slot)
+        if closes - cursor >= duration:
+            windows.append({"start": cursor, "end": closes})
+        return windows
+
+    def _apply(self, day: date, add: Optional[Tuple[datetime, int]] = None,
+               remove: Optional[Tuple[datetime, int]] = None):
+        # the caller already bumped slots:<day>; adopt the new generation if we hold the day
+        gen = cache.generation(slot_namespace(day))
+        with self.lock:
+            entry = self._days.get(day)
+            if entry is None:
+                return
+            bucket = entry[1]
+            if remove is not None:
+                i = bisect.bisect_left(bucket, remove)
+                if i < len(bucket) and bucket[i] == remove:
+                    del bucket[i]
+            if add is not None:
+                bisect.insort(bucket, add)
+            self._days[day] = (gen, bucket)
+
+    def add(self, start: datetime, appt_id: int):
+        start = naive_utc(start)
+        self._apply(start.date(), add=(start, appt_id))
+
+    def remove(self, start: datetime, appt_id: int):
+        start = naive_utc(start)
+        self._apply(start.date(), remove=(start, appt_id))
+
+
+slot_index = DayIntervalIndex()
@@ -0,0 +1,30 @@
+# benchmarks/common.py
+# Helpers shared by the benchmark scripts: timing, percentile summaries and an
+# in-thread uvicorn server for runs with real concurrent HTTP clients.
+import statistics
+import threading
+import time
+
+import uvicorn
+
+
+def percentiles(samples):
+    if len(samples) < 2:
+        return {"count": len(samples)}
+    qs = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"count": len(samples), "p50": round(qs[49], 3), "p95": round(qs[94], 3), "p99": round(qs[98], 3)}
+
+
+def timed(client, method, url, **kw):
+    t0 = time.perf_counter()
+    r = client.request(method, url, **kw)
+    return (time.perf_counter() - t0) * 1000, r.status_code
+
+
+def serve(app, port, lifespan="on"):
+    """Run `app` under uvicorn in a daemon thread; returns the server (set should_exit to stop)."""
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning", lifespan=lifespan))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
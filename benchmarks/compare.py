@@ -0,0 +1,52 @@
+# benchmarks/compare.py
+"""
+Compare two benchmarks/run.py reports endpoint by endpoint.
+
+    python -m benchmarks.compare baseline.json candidate.json --metric p95 --max-regression 1.25
+
+Prints one line per phase/endpoint with both values and their ratio, and exits
+non-zero when any ratio exceeds --max-regression, so CI can gate on it.
+"""
+import argparse
+import json
+import sys
+
+PHASES = ("in_process", "concurrent")
+
+
+def compare(old, new, metric):
+    rows = []
+    for phase in PHASES:
+        for name, stats in sorted(new.get(phase, {}).items()):
+            before = old.get(phase, {}).get(name, {}).get(metric)
+            after = stats.get(metric)
+            ratio = round(after / before, 3) if before and after is not None else None
+            rows.append((phase, name, before, after, ratio))
+    return rows
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("baseline")
+    ap.add_argument("candidate")
+    ap.add_argument("--metric", default="p95", choices=("p50", "p95", "p99"))
+    ap.add_argument("--max-regression", type=float, default=None)
+    args = ap.parse_args(argv)
+    with open(args.baseline) as fh:
+        old = json.load(fh)
+    with open(args.candidate) as fh:
+        new = json.load(fh)
+
+    failed = False
+    print(f"{'phase':<11} {'endpoint':<34} {'baseline':>10} {'candidate':>10} {'ratio':>7}")
+    for phase, name, before, after, ratio in compare(old, new, args.metric):
+        flag = ""
+        if args.max_regression and ratio and ratio > args.max_regression:
+            flag, failed = "  REGRESSION", True
+        print(f"{phase:<11} {name:<34} {before if before is not None else '-':>10} "
+              f"{after if after is not None else '-':>10} {ratio if ratio is not None else '-':>7}{flag}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
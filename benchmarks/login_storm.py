@@ -0,0 +1,109 @@
+# benchmarks/login_storm.py
+"""
+Login storm benchmark: measures latency of a cheap route (/health) and an
+authenticated read (/patients) at rest and while a burst of concurrent
+/users/token requests hammers bcrypt.
+
+    python -m benchmarks.login_storm --logins 200 --concurrency 50
+
+Prints one JSON document with p50/p95/p99 (ms) per phase, so runs can be diffed.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import auth, database, models
+from app import main as app_main
+from benchmarks.common import percentiles, serve, timed
+
+
+def start_server(port):
+    # isolated SQLite file so the benchmark never touches clinic_oop.db
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    session_local = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    def override_get_db():
+        db = session_local()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = app_main.app
+    app.dependency_overrides[database.get_db] = override_get_db
+    app.dependency_overrides[auth.get_db] = override_get_db
+    return serve(app, port, lifespan="off")
+
+
+def probe(base, headers, stop, out):
+    with httpx.Client(base_url=base, timeout=60) as c:
+        while not stop.is_set():
+            out["health"].append(timed(c, "GET", "/health")[0])
+            out["patients"].append(timed(c, "GET", "/patients", headers=headers)[0])
+
+
+def run(logins, concurrency, probe_seconds, port):
+    server = start_server(port)
+    base = f"http://127.0.0.1:{port}"
+    with httpx.Client(base_url=base) as c:
+        c.post("/users/create", json={"username": "bench", "password": "bench-pw", "role": "doctor"})
+        token = c.post("/users/token", data={"username": "bench", "password": "bench-pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    report = {}
+    # phase 1: probes alone
+    idle = {"health": [], "patients": []}
+    stop = threading.Event()
+    t = threading.Thread(target=probe, args=(base, headers, stop, idle))
+    t.start()
+    time.sleep(probe_seconds)
+    stop.set()
+    t.join()
+    report["idle"] = {k: percentiles(v) for k, v in idle.items()}
+
+    # phase 2: probes during the login storm
+    storm = {"health": [], "patients": []}
+    stop = threading.Event()
+    t = threading.Thread(target=probe, args=(base, headers, stop, storm))
+    t.start()
+    login_lat, statuses = [], {}
+
+    def login(_):
+        with httpx.Client(base_url=base, timeout=60) as c:
+            ms, code = timed(c, "POST", "/users/token", data={"username": "bench", "password": "bench-pw"})
+        return ms, code
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        for ms, code in ex.map(login, range(logins)):
+            login_lat.append(ms)
+            statuses[code] = statuses.get(code, 0) + 1
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    t.join()
+    report["storm"] = {k: percentiles(v) for k, v in storm.items()}
+    report["logins"] = {**percentiles(login_lat), "statuses": statuses,
+                        "throughput_rps": round(logins / elapsed, 1),
+                        "hash_workers": auth.HASH_WORKERS, "hash_queue_limit": auth.HASH_QUEUE_LIMIT}
+    server.should_exit = True
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--logins", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=50)
+    ap.add_argument("--probe-seconds", type=float, default=3.0)
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args()
+    print(json.dumps(run(args.logins, args.concurrency, args.probe_seconds, args.port), indent=2))
@@ -0,0 +1,180 @@
+# benchmarks/run.py
+"""
+Endpoint latency/throughput benchmark against a large seeded dataset.
+
+    python -m benchmarks.run --patients 1000000 --appointments 5000000 --medicines 50000 \\
+        --requests 300 --concurrency 32 --duration 30 --out bench.json
+
+Builds (or reuses) the dataset from benchmarks/seed.py, points the app at it, then
+runs two phases. "in_process" sends requests one by one through TestClient, with
+no network or server overhead. "concurrent" runs uvicorn and has --concurrency
+HTTP clients send a weighted request mix for --duration seconds. Each phase
+reports p50/p95/p99 (ms), throughput and error counts per endpoint as JSON. Use
+benchmarks/compare.py to diff two reports.
+
+The app's Redis database (--redis-db, default 15) is flushed at start so cached
+pages from another dataset cannot leak in.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import httpx
+
+from benchmarks import seed as seeder
+from benchmarks.common import percentiles, serve, timed
+
+TRIGRAMS = ["Pat", "Kha", "Smi", "Gar", "Che", "Sin", "Asha", "Ravi", "Meer", "Omar"]
+
+
+def scenarios(meta):
+    """name -> (weight in the concurrent mix, request builder taking an rng)."""
+    from app.pagination import encode_cursor
+
+    p = meta["params"]
+    n_pat, n_med = max(p["patients"], 1), max(p["medicines"], 1)
+    day = seeder.EPOCH.date()
+    return {
+        "GET /patients": (5, lambda r: ("GET", "/patients", {})),
+        "GET /patients?page=deep": (1, lambda r: ("GET", f"/patients?page={r.randint(100, 1000)}", {})),
+        "GET /patients?cursor=deep": (3, lambda r: ("GET", f"/patients?cursor={encode_cursor(r.randint(1, n_pat))}", {})),
+        "GET /patients?q": (5, lambda r: ("GET", f"/patients?q={r.choice(TRIGRAMS)}", {})),
+        "GET /patients/{id}": (10, lambda r: ("GET", f"/patients/{r.randint(1, n_pat)}", {})),
+        "GET /patients/{id}/timeline": (3, lambda r: ("GET", f"/patients/{r.randint(1, n_pat)}/timeline?limit=20", {})),
+        "GET /appointments?status": (3, lambda r: ("GET", "/appointments?status=scheduled", {})),
+        "GET /appointments/availability": (2, lambda r: (
+            "GET", f"/appointments/availability?date={day + timedelta(days=r.randint(-300, 300))}", {})),
+        "GET /medicines?q": (5, lambda r: ("GET", f"/medicines?q={r.choice(seeder.MED_STEMS)}", {})),
+        "GET /medicines/suggest": (8, lambda r: ("GET", f"/medicines/suggest?q={r.choice(seeder.MED_STEMS)[:3]}", {})),
+        "GET /medicines/{id}": (3, lambda r: ("GET", f"/medicines/{r.randint(1, n_med)}", {})),
+        "GET /reports/overview": (2, lambda r: ("GET", "/reports/overview", {})),
+        "POST /users/token": (1, lambda r: ("POST", "/users/token",
+                                            {"data": {"username": meta["user"], "password": meta["password"]}})),
+    }
+
+
+def summarize(samples, elapsed):
+    out = {}
+    for name, rows in sorted(samples.items()):
+        lat = [ms for ms, _ in rows]
+        errors = sum(1 for _, code in rows if code >= 400)
+        out[name] = {**percentiles(lat), "rps": round(len(rows) / elapsed[name], 1) if elapsed[name] else None,
+                     "errors": errors}
+    return out
+
+
+def run_in_process(app, meta, requests, login_requests, seed_value):
+    from fastapi.testclient import TestClient
+
+    rng = random.Random(seed_value)
+    samples, elapsed = defaultdict(list), {}
+    with TestClient(app) as client:
+        token = client.post("/users/token", data={"username": meta["user"], "password": meta["password"]}).json()
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+        for name, (_, build) in scenarios(meta).items():
+            n = login_requests if name == "POST /users/token" else requests
+            for _ in range(min(5, n)):  # warm up connections, indexes and caches
+                method, url, kw = build(rng)
+                client.request(method, url, headers=headers, **kw)
+            t0 = time.perf_counter()
+            for _ in range(n):
+                method, url, kw = build(rng)
+                samples[name].append(timed(client, method, url, headers=headers, **kw))
+            elapsed[name] = time.perf_counter() - t0
+    return summarize(samples, elapsed)
+
+
+def run_concurrent(app, meta, concurrency, duration, port, seed_value):
+    server = serve(app, port)
+    base = f"http://127.0.0.1:{port}"
+    with httpx.Client(base_url=base, timeout=60) as c:
+        token = c.post("/users/token", data={"username": meta["user"], "password": meta["password"]}).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    mix = scenarios(meta)
+    names = list(mix)
+    weights = [mix[n][0] for n in names]
+    samples, lock = defaultdict(list), threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(i):
+        rng = random.Random(seed_value * 1000 + i)  # deterministic request stream per client
+        local = defaultdict(list)
+        with httpx.Client(base_url=base, timeout=60, headers=headers) as c:
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                method, url, kw = mix[name][1](rng)
+                local[name].append(timed(c, method, url, **kw))
+        with lock:
+            for k, v in local.items():
+                samples[k].extend(v)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        list(ex.map(worker, range(concurrency)))
+    wall = time.perf_counter() - t0
+    server.should_exit = True
+    report = summarize(samples, {k: wall for k in samples})
+    everything = [row for rows in samples.values() for row in rows]
+    report["total"] = summarize({"total": everything}, {"total": wall})["total"]
+    return report
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    seeder.add_arguments(ap)
+    ap.add_argument("--requests", type=int, default=200, help="in-process requests per endpoint")
+    ap.add_argument("--login-requests", type=int, default=20, help="in-process /users/token requests (bcrypt)")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=15.0, help="seconds of concurrent load")
+    ap.add_argument("--port", type=int, default=8766)
+    ap.add_argument("--redis-db", default="15")
+    ap.add_argument("--phases", default="in_process,concurrent")
+    ap.add_argument("--out", help="write the JSON report here as well as to stdout")
+    args = ap.parse_args(argv)
+
+    # configure the app for the dataset before anything imports app.database / app.cache
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    os.environ["REDIS_DB"] = args.redis_db
+    os.environ.setdefault("REMINDERS_ENABLED", "0")
+    meta = seeder.seed(args.db, args.patients, args.appointments, args.medicines, args.users, args.seed, args.force)
+
+    from app.cache import cache
+    from app.main import app
+    redis_up = cache.flush()
+
+    phases = args.phases.split(",")
+    report = {"meta": {"dataset": meta["params"], "seed_seconds": meta.get("seconds"), "git": git_revision(),
+                       "python": platform.python_version(), "platform": platform.platform(),
+                       "redis": redis_up, "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "args": {k: v for k, v in vars(args).items() if k not in ("db", "out", "force")}}}
+    if "in_process" in phases:
+        report["in_process"] = run_in_process(app, meta, args.requests, args.login_requests, args.seed)
+    if "concurrent" in phases:
+        report["concurrent"] = run_concurrent(app, meta, args.concurrency, args.duration, args.port, args.seed)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+# benchmarks/seed.py
+"""
+Deterministic dataset generator for benchmarks: the same --seed and sizes always
+produce the same rows, so numbers from different releases are comparable.
+
+    python -m benchmarks.seed --db /tmp/clinic-bench.db --patients 1000000 \\
+        --appointments 5000000 --medicines 50000
+
+Rows go in through executemany in chunks, one transaction per chunk, against a
+schema built by the app itself (create_all + migrations + search index).
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+CHUNK = 20000
+FIRST_NAMES = ["Asha", "Ravi", "Meera", "John", "Sara", "Omar", "Li", "Ana", "Ivan", "Zoe",
+               "Noah", "Emma", "Arjun", "Fatima", "Kenji", "Lucia", "Amir", "Priya", "Tom", "Nina"]
+LAST_NAMES = ["Khan", "Patel", "Smith", "Garcia", "Chen", "Singh", "Brown", "Kumar", "Lopez", "Ivanova",
+              "Sato", "Müller", "Rossi", "Okafor", "Nguyen", "Haddad", "Silva", "Novak", "Das", "Young"]
+MED_STEMS = ["Amoxi", "Parace", "Ibupro", "Metfor", "Amlodi", "Atorva", "Omepra", "Cetiri", "Losar", "Azithro",
+             "Ceph", "Doxy", "Predni", "Salbu", "Warfa", "Insu", "Levo", "Clopi", "Panto", "Rosu"]
+MED_SUFFIXES = ["cillin", "tamol", "fen", "min", "pine", "statin", "zole", "zine", "tan", "mycin"]
+STATUSES = ["scheduled"] * 6 + ["completed"] * 3 + ["canceled"]
+EPOCH = datetime(2026, 1, 1)  # fixed, so datasets do not depend on the day they were built
+BENCH_USER, BENCH_PASSWORD = "bench", "bench-pw"
+
+
+def patient_rows(rng, n):
+    for i in range(1, n + 1):
+        yield {"id": i, "first_name": rng.choice(FIRST_NAMES), "last_name": rng.choice(LAST_NAMES),
+               "dob": f"{rng.randint(1930, 2020)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+               "gender": rng.choice("MF"), "phone": f"9{rng.randrange(10**9):09d}",
+               "email": f"p{i}@example.test"}
+
+
+def appointment_rows(rng, n, patients):
+    for i in range(1, n + 1):
+        when = EPOCH + timedelta(minutes=30 * rng.randrange(-2 * 365 * 48, 2 * 365 * 48))
+        yield {"id": i, "patient_id": rng.randint(1, patients), "scheduled_at": when,
+               "reason": rng.choice(["Checkup", "Follow-up", "Vaccination", "Consultation"]),
+               "status": rng.choice(STATUSES), "created_at": when - timedelta(days=rng.randint(1, 60))}
+
+
+def medicine_rows(rng, n):
+    for i in range(1, n + 1):
+        yield {"id": i, "name": f"{rng.choice(MED_STEMS)}{rng.choice(MED_SUFFIXES)}-{i}",
+               "manufacturer": rng.choice(["Acme", "Zenith", "Orion", "Helix"]),
+               "quantity": rng.randint(0, 500), "reorder_threshold": rng.choice([5, 10, 20])}
+
+
+def user_rows(n, hashed):
+    roles = ["admin", "doctor", "nurse", "staff"]
+    yield {"id": 1, "username": BENCH_USER, "role": "admin", "hashed_password": hashed}
+    for i in range(2, n + 1):
+        yield {"id": i, "username": f"user{i}", "role": roles[i % 4], "hashed_password": hashed}
+
+
+def _load(engine, table, rows):
+    count, chunk = 0, []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK:
+            with engine.begin() as conn:
+                conn.execute(insert(table), chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        with engine.begin() as conn:
+            conn.execute(insert(table), chunk)
+        count += len(chunk)
+    return count
+
+
+def seed(db_path: str, patients: int, appointments: int, medicines: int, users: int = 100, seed_value: int = 42,
+         force: bool = False) -> dict:
+    """
+    Build the dataset at db_path, or reuse it when it was built with the same parameters.
+    Returns the dataset description stored alongside it.
+    """
+    from app import database, models, search, migrations, auth
+
+    params = {"patients": patients, "appointments": appointments, "medicines": medicines,
+              "users": users, "seed": seed_value}
+    meta_path = db_path + ".json"
+    if not force and os.path.exists(db_path) and os.path.exists(meta_path):
+        with open(meta_path) as fh:
+            meta = json.load(fh)
+        if meta.get("params") == params:
+            return meta
+    for suffix in ("", "-wal", "-shm", ".json"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    engine = database.build_engine(f"sqlite:///{db_path}")
+    models.Base.metadata.create_all(bind=engine)
+    migrations.migrate(engine)
+    with engine.begin() as conn:  # bulk-load first, index once at the end
+        for name in ("ai", "ad", "au"):
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {search.FTS_TABLE}_{name}")
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {search.FTS_TABLE}")
+
+    rng = random.Random(seed_value)
+    timings = {}
+    for name, table, rows in (
+        ("patients", models.Patient.__table__, patient_rows(rng, patients)),
+        ("appointments", models.Appointment.__table__, appointment_rows(rng, appointments, max(patients, 1))),
+        ("medicines", models.Medicine.__table__, medicine_rows(rng, medicines)),
+        ("users", models.User.__table__, user_rows(users, auth.get_password_hash(BENCH_PASSWORD))),
+    ):
+        t0 = time.perf_counter()
+        _load(engine, table, rows)
+        timings[name] = round(time.perf_counter() - t0, 2)
+    t0 = time.perf_counter()
+    search.ensure_patient_index(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    timings["index"] = round(time.perf_counter() - t0, 2)
+    engine.dispose()
+
+    meta = {"params": params, "seconds": timings, "user": BENCH_USER, "password": BENCH_PASSWORD}
+    with open(meta_path, "w") as fh:
+        json.dump(meta, fh, indent=2)
+    return meta
+
+
+def add_arguments(ap: argparse.ArgumentParser):
+    ap.add_argument("--db", default=os.path.join(os.getenv("TMPDIR", "/tmp"), "clinic-bench.db"))
+    ap.add_argument("--patients", type=int, default=100000)
+    ap.add_argument("--appointments", type=int, default=500000)
+    ap.add_argument("--medicines", type=int, default=5000)
+    ap.add_argument("--users", type=int, default=100)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--force", action="store_true", help="rebuild even if a matching dataset exists")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_arguments(ap)
+    args = ap.parse_args()
+    print(json.dumps(seed(args.db, args.patients, args.appointments, args.medicines, args.users,
+                          args.seed, args.force), indent=2))
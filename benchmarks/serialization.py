@@ -0,0 +1,110 @@
+# benchmarks/serialization.py
+"""
+CPU cost of serving cached JSON: the old decode/validate/re-encode path against
+pre-serialized bytes.
+
+    python -m benchmarks.serialization --rows 10 --iterations 20000 --out serialization.json
+
+For a single patient (GET /patients/{id}) and a medicine search page of --rows
+items it times, in process CPU seconds per call:
+
+- hit_old: json.loads of the cached text, then the response_model round trip
+  FastAPI does on a returned dict (validate + dump_json).
+- hit_new: unpack the cached bytes into a Response (what the routers do now).
+- miss_old: from_orm + .dict(), json.dumps for the cache, then the response_model
+  round trip.
+- miss_new: app.responses.encode once, pack for the cache.
+
+orjson is timed as a plain dumps() reference when it is installed. No database
+or server is involved; see benchmarks/run.py for end-to-end latency.
+"""
+import argparse
+import json
+import sys
+import time
+import warnings
+from types import SimpleNamespace
+from typing import List
+
+from app.responses import adapter, encode, json_response, pack, unpack
+from app.schemas import MedicineOut, PatientOut
+
+
+def cpu_per_call(fn, iterations):
+    fn()
+    t0 = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - t0) / iterations
+
+
+def fixtures(rows):
+    patient = SimpleNamespace(id=1, first_name="Asha", last_name="Khan", dob="1980-02-03", gender="F",
+                              phone="9876543210", email="asha@example.test", address="12 Park Road",
+                              medical_history="Asthma; penicillin allergy")
+    medicines = [SimpleNamespace(id=i, name=f"Paracetamol-{i}", manufacturer="Acme", quantity=i * 3,
+                                 description="500 mg tablets", reorder_threshold=10) for i in range(1, rows + 1)]
+    return {"patient": (PatientOut, patient), "medicine_page": (List[MedicineOut], medicines)}
+
+
+def cases(tp, obj):
+    ta = adapter(tp)
+    many = isinstance(obj, list)
+
+    def old_dict():
+        if many:
+            return [tp.__args__[0].from_orm(o).dict() for o in obj]
+        return tp.from_orm(obj).dict()
+
+    cached_text = json.dumps(old_dict(), default=str)
+    cached_bytes = pack(encode(tp, obj))
+
+    def hit_old():
+        ta.dump_json(ta.validate_python(json.loads(cached_text)))
+
+    def hit_new():
+        json_response(*unpack(cached_bytes))
+
+    def miss_old():
+        out = old_dict()
+        json.dumps(out, default=str)
+        ta.dump_json(ta.validate_python(out))
+
+    def miss_new():
+        json_response(*unpack(pack(encode(tp, obj))))
+
+    found = {"hit_old": hit_old, "hit_new": hit_new, "miss_old": miss_old, "miss_new": miss_new}
+    try:
+        import orjson
+    except ImportError:
+        return found
+    plain = json.loads(cached_text)
+    found["orjson_dumps"] = lambda: orjson.dumps(plain)
+    return found
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, default=10, help="medicines per search page")
+    ap.add_argument("--iterations", type=int, default=20000)
+    ap.add_argument("--out", help="write the JSON report here as well as to stdout")
+    args = ap.parse_args(argv)
+    warnings.simplefilter("ignore", DeprecationWarning)  # the old path uses from_orm/.dict() on purpose
+
+    report = {"meta": {"rows": args.rows, "iterations": args.iterations}}
+    for name, (tp, obj) in fixtures(args.rows).items():
+        timings = {case: cpu_per_call(fn, args.iterations) for case, fn in cases(tp, obj).items()}
+        row = {case: round(s * 1e6, 2) for case, s in timings.items()}  # microseconds per call
+        row["hit_speedup"] = round(timings["hit_old"] / timings["hit_new"], 1)
+        row["miss_speedup"] = round(timings["miss_old"] / timings["miss_new"], 1)
+        report[name] = row
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
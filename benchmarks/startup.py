@@ -0,0 +1,110 @@
+# benchmarks/startup.py
+"""
+Cold-start benchmark: how long until a fresh worker can serve.
+
+    python -m benchmarks.startup --runs 10 --out startup.json
+
+Two measurements, each over --runs fresh interpreters against a database
+prepared beforehand with `python -m app.migrations` (as a deploy would):
+
+- import: wall time of `import app.main` inside the child.
+- ready: from spawning `uvicorn app.main:app` until GET /health answers 200,
+  which includes the lifespan (schema check per --schema-mode, index warm-up).
+
+--importtime adds the slowest modules by cumulative import time (python -X
+importtime) so a regression can be traced to the import that caused it.
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.common import percentiles
+
+IMPORT_PROBE = "import time; t = time.perf_counter(); import app.main; print((time.perf_counter() - t) * 1000)"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import(env):
+    out = subprocess.run([sys.executable, "-c", IMPORT_PROBE], env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def measure_ready(env, timeout=30.0):
+    port = free_port()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+                             "--log-level", "warning"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - t0 < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=0.5).status_code == 200:
+                    return (time.perf_counter() - t0) * 1000
+            except httpx.HTTPError:
+                pass
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with {proc.returncode} before becoming ready")
+            time.sleep(0.005)
+        raise RuntimeError("server not ready within timeout")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def slowest_imports(env, top):
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], env=env,
+                         capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        rows.append((int(cumulative), name.strip()))
+    return [{"module": name, "cumulative_ms": round(us / 1000, 2)} for us, name in sorted(rows, reverse=True)[:top]]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--db", help="database to start against (default: a fresh prepared temp database)")
+    ap.add_argument("--schema-mode", default="check", choices=("migrate", "check", "off"))
+    ap.add_argument("--redis-db", default="15")
+    ap.add_argument("--importtime", type=int, default=0, metavar="N", help="also list the N slowest imports")
+    ap.add_argument("--out", help="write the JSON report here as well as to stdout")
+    args = ap.parse_args(argv)
+
+    db = args.db or os.path.join(tempfile.mkdtemp(prefix="clinic-startup-"), "clinic.db")
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db}", "REDIS_DB": args.redis_db,
+           "SCHEMA_ON_STARTUP": args.schema_mode}
+    subprocess.run([sys.executable, "-m", "app.migrations"], env=env, check=True, stdout=subprocess.DEVNULL)
+
+    imports = [measure_import(env) for _ in range(args.runs)]
+    ready = [measure_ready(env) for _ in range(args.runs)]
+    report = {"meta": {"runs": args.runs, "schema_mode": args.schema_mode, "python": platform.python_version(),
+                       "platform": platform.platform(), "started": time.strftime("%Y-%m-%dT%H:%M:%S")},
+              "import_ms": {**percentiles(imports), "min": round(min(imports), 3)},
+              "ready_ms": {**percentiles(ready), "min": round(min(ready), 3)}}
+    if args.importtime:
+        report["slowest_imports"] = slowest_imports(env, args.importtime)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
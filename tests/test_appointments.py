@@ -26,3 +26,66 @@ def test_create_and_cancel_appointment(client: TestClient):
     r2 = client.patch(f"/appointments/{apid}/cancel", headers=headers)
     assert r2.status_code == 200
     assert r2.json()["status"] == "canceled"
+
+
+def test_overlapping_bookings_are_rejected(client: TestClient):
+    token = create_doctor_token(client, username="doc_slots")
+    headers = {"Authorization": f"Bearer {token}"}
+    pid = client.post("/patients", json={"first_name": "Slotty"}, headers=headers).json()["id"]
+    day = (datetime.utcnow() + timedelta(days=30)).date()
+    at = lambda hh, mm: datetime(day.year, day.month, day.day, hh, mm).isoformat()
+
+    first = client.post("/appointments", json={"patient_id": pid, "scheduled_at": at(10, 0)}, headers=headers)
+    assert first.status_code == 201
+    r = client.post("/appointments", json={"patient_id": pid, "scheduled_at": at(10, 15)}, headers=headers)
+    assert r.status_code == 409
+    second = client.post("/appointments", json={"patient_id": pid, "scheduled_at": at(10, 30)}, headers=headers)
+    assert second.status_code == 201
+
+    r = client.get(f"/appointments/availability?date={day}&duration=60", headers=headers)
+    assert r.status_code == 200
+    assert [(w["start"][11:16], w["end"][11:16]) for w in r.json()] == [("09:00", "10:00"), ("11:00", "17:00")]
+
+    # moving onto a taken slot conflicts; freeing it by cancel makes it bookable
+    sid = second.json()["id"]
+    r = client.patch(f"/appointments/{sid}/reschedule", params={"new_time": at(9, 45)}, headers=headers)
+    assert r.status_code == 409
+    client.patch(f"/appointments/{first.json()['id']}/cancel", headers=headers)
+    r = client.patch(f"/appointments/{sid}/reschedule", params={"new_time": at(9, 45)}, headers=headers)
+    assert r.status_code == 200
+    r = client.get(f"/appointments/availability?date={day}&duration=30", headers=headers)
+    assert [(w["start"][11:16], w["end"][11:16]) for w in r.json()] == [("09:00", "09:45"), ("10:15", "17:00")]
+
+
+def test_overlap_check_does_not_trust_the_slot_index(client: TestClient, db_session):
+    from app.models import Appointment
+    token = create_doctor_token(client, username="doc_race")
+    headers = {"Authorization": f"Bearer {token}"}
+    pid = client.post("/patients", json={"first_name": "Racy"}, headers=headers).json()["id"]
+    day = (datetime.utcnow() + timedelta(days=40)).date()
+    at = datetime(day.year, day.month, day.day, 14, 0)
+    client.get(f"/appointments/availability?date={day}", headers=headers)  # this worker's index now holds the day
+
+    # another worker books 14:10 and its generation bump hasn't reached us
+    db_session.add(Appointment(patient_id=pid, scheduled_at=at + timedelta(minutes=10), status="scheduled"))
+    db_session.commit()
+    r = client.post("/appointments", json={"patient_id": pid, "scheduled_at": at.isoformat()}, headers=headers)
+    assert r.status_code == 409
+    assert db_session.query(Appointment).filter_by(scheduled_at=at).count() == 0  # rolled back
+
+
+def test_offset_timestamps_are_checked_as_utc(client: TestClient):
+    token = create_doctor_token(client, username="doc_tz")
+    headers = {"Authorization": f"Bearer {token}"}
+    pid = client.post("/patients", json={"first_name": "Zoned"}, headers=headers).json()["id"]
+    day = (datetime.utcnow() + timedelta(days=50)).date()
+    at = f"{day.isoformat()}T15:00:00+05:00"  # 10:00 UTC
+
+    first = client.post("/appointments", json={"patient_id": pid, "scheduled_at": at}, headers=headers)
+    assert first.status_code == 201
+    assert first.json()["scheduled_at"].startswith(f"{day.isoformat()}T10:00:00")
+    r = client.post("/appointments", json={"patient_id": pid, "scheduled_at": at}, headers=headers)
+    assert r.status_code == 409
+    utc = f"{day.isoformat()}T10:15:00"
+    r = client.post("/appointments", json={"patient_id": pid, "scheduled_at": utc}, headers=headers)
+    assert r.status_code == 409
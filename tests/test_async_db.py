@@ -0,0 +1,70 @@
+# tests/test_async_db.py
+# Async mode: the async routers on an aiosqlite AsyncSession, sharing a SQLite file
+# with the sync routers that still serve everything else.
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import auth, database, models
+from app.routers import async_users, async_patients, async_appointments, async_medicines
+from app.routers import users, patients, appointments, medicines
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("greenlet")
+
+
+@pytest.fixture()
+def async_client(tmp_path, monkeypatch):
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    sync_engine = create_engine(url, connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=sync_engine)
+    sync_session = sessionmaker(bind=sync_engine, autocommit=False, autoflush=False)
+    async_engine = create_async_engine(database.async_url(url))
+    async_session = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    def override_get_db():
+        db = sync_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with async_session() as db:
+            yield db
+
+    app = FastAPI()
+    for r in (async_users, async_patients, async_appointments, async_medicines, users, patients, appointments, medicines):
+        app.include_router(r.router)
+    app.dependency_overrides[database.get_db] = override_get_db
+    app.dependency_overrides[auth.get_db] = override_get_db
+    app.dependency_overrides[database.get_async_db] = override_get_async_db
+    # get_current_user opens its own session, and only on a session-cache miss
+    monkeypatch.setattr(database, "SessionLocal", sync_session)
+    with TestClient(app) as client:
+        yield client
+    sync_engine.dispose()
+
+
+def test_async_routes_crud_and_pagination(async_client):
+    c = async_client
+    assert c.post("/users/create", json={"username": "adoc", "password": "pw", "role": "admin"}).status_code == 201
+    token = c.post("/users/token", data={"username": "adoc", "password": "pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    ids = [c.post("/patients", json={"first_name": f"Async{i}"}, headers=headers).json()["id"] for i in range(12)]
+    r = c.get(f"/patients/{ids[0]}", headers=headers)
+    assert r.status_code == 200 and r.json()["first_name"] == "Async0"
+    r = c.get("/patients", headers=headers)
+    assert len(r.json()) == 10
+    r = c.get(f"/patients?cursor={r.headers['X-Next-Cursor']}", headers=headers)
+    assert [p["id"] for p in r.json()] == ids[10:]
+
+    m = c.post("/medicines", json={"name": "AsyncMed", "quantity": 1}, headers=headers).json()
+    assert c.patch(f"/medicines/{m['id']}/adjust?delta=4", headers=headers).json()["quantity"] == 5
+    # literal sub-paths still reach the sync router
+    assert c.get("/medicines/suggest?q=async", headers=headers).status_code == 200
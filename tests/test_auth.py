@@ -11,3 +11,118 @@ def test_create_user_and_get_token(client):
     data = r2.json()
     assert "access_token" in data
     assert data["token_type"] == "bearer"
+
+
+def test_authenticated_requests_skip_user_lookup(client, db_session):
+    from sqlalchemy import event
+    engine = db_session.get_bind()
+
+    client.post("/users/create", json={"username": "cached", "password": "pw", "role": "doctor"})
+    token = client.post("/users/token", data={"username": "cached", "password": "pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    statements = []
+    listener = lambda conn, cursor, stmt, *a: statements.append(stmt)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        for _ in range(3):
+            assert client.get("/patients", headers=headers).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert not [s for s in statements if "FROM users" in s]
+
+
+def test_role_change_invalidates_cached_principal(client):
+    client.post("/users/create", json={"username": "boss", "password": "pw", "role": "admin"})
+    client.post("/users/create", json={"username": "demoted", "password": "pw", "role": "doctor"})
+    admin = client.post("/users/token", data={"username": "boss", "password": "pw"}).json()["access_token"]
+    token = client.post("/users/token", data={"username": "demoted", "password": "pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.post("/patients", json={"first_name": "Before"}, headers=headers).status_code == 201
+    r = client.patch("/users/demoted/role", json={"role": "staff"}, headers={"Authorization": f"Bearer {admin}"})
+    assert r.status_code == 200
+    assert client.post("/patients", json={"first_name": "After"}, headers=headers).status_code == 403
+
+    r = client.patch("/users/demoted/role", json={"role": "superuser"}, headers={"Authorization": f"Bearer {admin}"})
+    assert r.status_code == 422
+
+
+def test_login_rejected_fast_when_hashing_pool_is_full(client, monkeypatch):
+    from app import auth
+
+    client.post("/users/create", json={"username": "stormy", "password": "pw"})
+    # a pool with no free slot: every hash request overflows the queue
+    monkeypatch.setattr(auth, "hashing_pool", auth.HashingPool(workers=1, queue_limit=-1))
+    r = client.post("/users/token", data={"username": "stormy", "password": "pw"})
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+
+
+def test_logout_revokes_only_that_token(client):
+    client.post("/users/create", json={"username": "leaver", "password": "pw", "role": "doctor"})
+    first = client.post("/users/token", data={"username": "leaver", "password": "pw"}).json()["access_token"]
+    second = client.post("/users/token", data={"username": "leaver", "password": "pw"}).json()["access_token"]
+    h1, h2 = {"Authorization": f"Bearer {first}"}, {"Authorization": f"Bearer {second}"}
+
+    assert client.post("/users/logout", headers=h1).status_code == 204
+    assert client.get("/patients", headers=h1).status_code == 401
+    assert client.post("/users/logout", headers=h1).status_code == 401
+    assert client.get("/patients", headers=h2).status_code == 200
+
+
+def test_admin_revokes_every_session_of_a_user(client):
+    client.post("/users/create", json={"username": "root2", "password": "pw", "role": "admin"})
+    client.post("/users/create", json={"username": "lost", "password": "pw", "role": "nurse"})
+    admin = {"Authorization": f"Bearer {client.post('/users/token', data={'username': 'root2', 'password': 'pw'}).json()['access_token']}"}
+    tokens = [client.post("/users/token", data={"username": "lost", "password": "pw"}).json()["access_token"] for _ in range(2)]
+
+    assert client.post("/users/lost/revoke", headers=admin).status_code == 204
+    for t in tokens:
+        assert client.get("/patients", headers={"Authorization": f"Bearer {t}"}).status_code == 401
+    fresh = client.post("/users/token", data={"username": "lost", "password": "pw"}).json()["access_token"]
+    assert client.get("/patients", headers={"Authorization": f"Bearer {fresh}"}).status_code == 200
+    assert client.post("/users/nobody/revoke", headers=admin).status_code == 404
+
+
+def test_revocation_list_syncs_only_when_version_moves(db_session):
+    import time
+    from sqlalchemy.orm import sessionmaker
+    from app.revocation import RevocationList
+
+    class Shared:  # stands in for the Redis version counter
+        version = 0
+
+        def bump_revocations(self):
+            self.version += 1
+
+        def revocation_version(self):
+            return self.version
+
+    class Worker(RevocationList):
+        loads = 0
+
+        def _load(self):
+            self.loads += 1
+            return super()._load()
+
+    shared, sessions = Shared(), sessionmaker(bind=db_session.get_bind())
+    worker_a = Worker(shared, sync_seconds=0, session_factory=sessions)
+    worker_b = Worker(shared, sync_seconds=0, session_factory=sessions)
+    assert not worker_b.is_revoked("t1", "amy", time.time())
+    worker_a.revoke_token(db_session, "t1", time.time() + 60)
+    assert worker_b.is_revoked("t1", "amy", time.time())  # picked up from the database
+    loads = worker_b.loads
+    assert not worker_b.is_revoked("t2", "amy", time.time())
+    assert worker_b.loads == loads  # version unchanged: nothing reloaded
+
+    issued = time.time()
+    worker_b.revoke_user(db_session, "amy")
+    assert worker_a.is_revoked("t3", "amy", issued)
+    assert not worker_a.is_revoked("t4", "amy", time.time() + 1)
+
+    # no shared counter (no Redis), or a restart: the database still has every revocation
+    shared.revocation_version = lambda: None
+    restarted = Worker(shared, sync_seconds=0, session_factory=sessions)
+    assert restarted.is_revoked("t1", "bob", time.time())
+    assert restarted.is_revoked("t5", "amy", issued)
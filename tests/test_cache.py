@@ -0,0 +1,213 @@
+# tests/test_cache.py
+import time
+import redis
+from app.cache import Cache, LocalCache, RedisLink
+
+
+def test_local_cache_lru_eviction_and_ttl():
+    l1 = LocalCache(maxsize=2)
+    l1.set("a", "1", ttl=60)
+    l1.set("b", "2", ttl=60)
+    assert l1.get("a") == "1"  # a is now most recently used
+    l1.set("c", "3", ttl=60)
+    assert l1.get("b") is None
+    assert l1.get("a") == "1" and l1.get("c") == "3"
+    assert l1.evictions == 1
+
+    l1.set("short", "x", ttl=0.01)
+    time.sleep(0.02)
+    assert l1.get("short") is None
+    stats = l1.stats()
+    assert stats["hits"] == 3 and stats["misses"] == 2
+
+
+def test_cache_serves_from_l1_and_invalidates_by_namespace():
+    c = Cache(None)  # no Redis: the L1 still caches
+    key = c.key("medicines", "search", "para", "page", 1)
+    c.set(key, [{"id": 1}])
+    assert c.get(key) == '[{"id": 1}]'
+
+    c.invalidate("medicines")
+    assert c.key("medicines", "search", "para", "page", 1) != key
+    assert c.key("patients", "x") == c.key("patients", "x")
+    assert c.shared_generation("patients") is None  # process-local: not for ETags
+    assert c.stats()["l1"]["medicines"]["hits"] == 1
+
+
+def test_process_local_generations_outlive_gen_ttl(monkeypatch):
+    import app.cache
+    monkeypatch.setattr(app.cache, "GEN_TTL", 0.01)
+    c = Cache(None)  # no Redis: only this worker's invalidate moves a generation
+    key = c.key("medicines", "search", "para")
+    c.set(key, "[]")
+    time.sleep(0.02)
+    assert c.key("medicines", "search", "para") == key
+    assert c.get(key) == "[]"  # the L1 keeps serving past GEN_TTL
+
+    c.invalidate("medicines")
+    moved = c.generation("medicines")
+    assert c.key("medicines", "search", "para") != key
+    time.sleep(0.02)
+    assert c.generation("medicines") == moved
+
+
+def test_circuit_breaker_skips_redis_and_replays_on_reconnect():
+    class FlakyRedis:  # fails every command until `up`
+        up, calls, incrs = False, 0, []
+
+        def _call(self):
+            self.calls += 1
+            if not self.up:
+                raise redis.ConnectionError("down")
+
+        def get(self, key):
+            self._call()
+
+        def setex(self, *args):
+            self._call()
+
+        def ping(self):
+            self._call()
+
+        def pipeline(self, transaction=True):
+            outer = self
+
+            class Pipe:
+                def set(self, *a, **kw):
+                    pass
+
+                def incr(self, key):
+                    outer.incrs.append(key)
+
+                def execute(self):
+                    outer._call()
+            return Pipe()
+
+    fake = FlakyRedis()
+    c = Cache(RedisLink(lambda: fake, threshold=2, window=60, retry_seconds=0.01))
+    c.link.reached = True  # Redis was up before this outage
+    c.get("patient:1:x")
+    c.set("patient:1:x", "a")
+    assert c.link.is_open and fake.calls == 2
+    for _ in range(100):
+        c.get("patient:1:y")  # skipped without touching the socket
+    c.invalidate("patient:1")  # applied locally, queued for Redis
+
+    fake.up = True
+    deadline = time.monotonic() + 2
+    while c.link.is_open and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not c.link.is_open
+    while not fake.incrs and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert fake.incrs == ["gen:patient:1"]  # the outage invalidation reached Redis
+    assert c.stats()["redis"]["circuit_trips"] == 1
+
+
+def test_async_callers_reach_redis_off_the_event_loop():
+    import asyncio
+    import threading
+    threads = []
+
+    class RecordingRedis:  # notes which thread each command runs on
+        def get(self, key):
+            threads.append(threading.get_ident())
+
+        def pipeline(self, transaction=True):
+            class Pipe:
+                def set(self, *a, **kw):
+                    pass
+
+                def incr(self, key):
+                    pass
+
+                def execute(self):
+                    threads.append(threading.get_ident())
+            return Pipe()
+
+    c = Cache(RedisLink(lambda: RecordingRedis()))
+
+    async def handler():
+        await c.run(c.get, "patient:1:body")
+        c.invalidate("patient:1")  # as an async-mode service does, from the loop
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(handler())  # waits for the executor on shutdown
+    assert len(threads) == 2 and loop_thread not in threads
+
+
+def test_pending_invalidations_stay_bounded(monkeypatch):
+    import app.cache
+
+    class SleepyRedis:  # never answers until `up`
+        up, scanned, incrs = False, [], []
+
+        def get(self, key):
+            raise redis.ConnectionError("down")
+
+        def scan_iter(self, match=None, count=None):
+            self.scanned.append(match)
+            return iter(["gen:patients", "gen:medicines"])
+
+        def pipeline(self, transaction=True):
+            outer = self
+
+            class Pipe:
+                def incr(self, key):
+                    outer.incrs.append(key)
+
+                def execute(self):
+                    if not outer.up:
+                        raise redis.ConnectionError("down")
+            return Pipe()
+
+    monkeypatch.setattr(app.cache, "PENDING_NAMESPACES_MAX", 3)
+    fake = SleepyRedis()
+    c = Cache(RedisLink(lambda: fake, threshold=1000))
+
+    c.invalidate("patient:1")  # Redis never reached: no list, just the marker
+    assert c._pending_all and not c._pending_namespaces
+
+    c._pending_all, c.link.reached = False, True
+    for i in range(3):
+        c.invalidate(f"patient:{i}")
+    assert len(c._pending_namespaces) == 3
+    c.invalidate("patient:99")  # one past the cap collapses the queue
+    assert c._pending_all and not c._pending_namespaces
+
+    fake.up = True
+    c._reconnected()
+    assert fake.scanned == ["gen:*"] and fake.incrs[-2:] == ["gen:patients", "gen:medicines"]
+    assert not c._pending_all
+
+
+def test_async_writers_send_counters_from_a_thread():
+    import asyncio
+    import threading
+
+    class RecordingRedis:
+        threads = []
+
+        def pipeline(self, transaction=True):
+            outer = self
+
+            class Pipe:
+                def hincrby(self, key, field, delta):
+                    pass
+
+                def execute(self):
+                    outer.threads.append(threading.get_ident())
+            return Pipe()
+
+    fake = RecordingRedis()
+    c = Cache(fake)
+
+    async def write():  # an async-mode service adjusting a counter
+        c.hincr("counters:overview", {"total_patients": 1})
+        while not fake.threads:
+            await asyncio.sleep(0.001)
+
+    asyncio.run(asyncio.wait_for(write(), 1))
+    assert fake.threads[0] != threading.get_ident()  # not from the loop's thread
+    c.hincr("counters:overview", {"total_patients": 1})  # sync callers send inline
+    assert fake.threads[-1] == threading.get_ident()
@@ -0,0 +1,48 @@
+# tests/test_database.py
+from sqlalchemy import text
+from app import database
+
+
+def test_sqlite_profile_applies_wal_and_pragmas(tmp_path):
+    eng = database.build_engine(f"sqlite:///{tmp_path / 'wal.db'}")
+    with eng.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == database.SQLITE_PRAGMAS["busy_timeout"]
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+    eng.dispose()
+
+
+def test_server_profile_uses_sized_pool_with_pre_ping():
+    opts = database.engine_options("postgresql+psycopg://u:p@db/clinic")
+    assert opts["pool_pre_ping"] is True
+    assert opts["pool_size"] == database.DB_POOL_SIZE
+    assert "connect_args" not in opts
+
+
+def test_schema_is_prepared_outside_import_and_checked_read_only(tmp_path, monkeypatch):
+    import os
+    import subprocess
+    import sys
+    import pytest
+    from app import migrations
+
+    eng = database.build_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    problems = migrations.check(eng)
+    assert any("missing table patients" in p for p in problems)
+    assert any("schema version 0" in p for p in problems)
+    assert migrations.check(eng) == problems  # checking changed nothing
+
+    monkeypatch.setattr(migrations, "SCHEMA_ON_STARTUP", "check")
+    with pytest.raises(RuntimeError, match="python -m app.migrations"):
+        migrations.on_startup(eng)  # an unprepared database must not start in check mode
+
+    assert migrations.prepare(eng) == [migrations.LATEST]
+    assert migrations.check(eng) == []
+    migrations.on_startup(eng)  # current schema: nothing to do
+    eng.dispose()
+
+    # importing the app must not create or touch a database
+    db = tmp_path / "untouched.db"
+    code = "import app.main, os, sys; sys.exit(os.path.exists(sys.argv[1]))"
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db}"}
+    assert subprocess.run([sys.executable, "-c", code, str(db)], env=env).returncode == 0
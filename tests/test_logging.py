@@ -0,0 +1,33 @@
+# tests/test_logging.py
+import json
+import logging
+from app.logger_config import DroppingQueueHandler, JsonFormatter, SamplingFilter, parse_sampling
+
+
+def record(name, msg, level=logging.INFO, args=()):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_sampling_keeps_one_in_n_per_template():
+    f = SamplingFilter(parse_sampling("clinic.cache=10, clinic=2"))
+    kept = [f.filter(record("clinic.cache", "Cache hit %s", args=(i,))) for i in range(100)]
+    assert sum(kept) == 10 and kept[0]
+    # templates are counted separately, the closest logger rate applies, warnings always pass
+    assert f.filter(record("clinic.cache", "Cache set %s"))
+    assert sum(f.filter(record("clinic.patients", "Listed")) for _ in range(10)) == 5
+    assert all(f.filter(record("clinic.cache", "Cache get error", logging.ERROR)) for _ in range(5))
+    assert f.filter(record("other", "x")) and f.filter(record("other", "x"))
+
+
+def test_json_lines_and_bounded_queue():
+    import queue
+    r = record("clinic.cache", "Cache hit %s", args=("patients:v1:x",))
+    r.sample_rate = 100
+    line = json.loads(JsonFormatter().format(r))
+    assert line["msg"] == "Cache hit patients:v1:x" and line["sample_rate"] == 100 and line["level"] == "INFO"
+
+    h = DroppingQueueHandler(queue.Queue(1))
+    before = DroppingQueueHandler.dropped
+    h.handle(record("clinic", "a"))
+    h.handle(record("clinic", "b"))  # queue full: dropped, not blocked or raised
+    assert DroppingQueueHandler.dropped == before + 1
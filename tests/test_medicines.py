@@ -32,3 +32,111 @@ def test_adjust_stock(client: TestClient):
     r2 = client.patch(f"/medicines/{mid}/adjust?delta=5", headers=headers)
     assert r2.status_code == 200
     assert r2.json()["quantity"] == 7
+
+
+def test_suggest_medicines_by_prefix(client: TestClient):
+    t = create_admin_token(client, username="muser3", password="pwd3")
+    headers = {"Authorization": f"Bearer {t}"}
+    for name in ("Amoxicillin", "Amlodipine", "Aspirin"):
+        client.post("/medicines", json={"name": name, "quantity": 4}, headers=headers)
+
+    r = client.get("/medicines/suggest?q=am", headers=headers)
+    assert r.status_code == 200
+    names = [m["name"] for m in r.json()]
+    assert names == ["Amlodipine", "Amoxicillin"]
+
+    # stock changes show up without a reload
+    mid = r.json()[0]["id"]
+    client.patch(f"/medicines/{mid}/adjust?delta=6", headers=headers)
+    r = client.get("/medicines/suggest?q=amlo&limit=1", headers=headers)
+    assert r.json()[0]["quantity"] == 10
+
+
+def test_adjust_batch_is_atomic(client: TestClient):
+    t = create_admin_token(client, username="muser4", password="pwd4")
+    headers = {"Authorization": f"Bearer {t}"}
+    a = client.post("/medicines", json={"name": "BatchA", "quantity": 10}, headers=headers).json()["id"]
+    b = client.post("/medicines", json={"name": "BatchB", "quantity": 1}, headers=headers).json()["id"]
+
+    body = [{"medicine_id": a, "delta": -3}, {"medicine_id": b, "delta": -5}, {"medicine_id": a, "delta": -2}]
+    r = client.patch("/medicines/adjust-batch", json=body, headers=headers)
+    assert r.status_code == 200
+    assert {m["id"]: m["quantity"] for m in r.json()} == {a: 5, b: 0}  # clamped at zero
+
+    # one unknown id rolls back the whole prescription
+    r = client.patch("/medicines/adjust-batch", json=[{"medicine_id": a, "delta": -1}, {"medicine_id": 999999, "delta": 1}], headers=headers)
+    assert r.status_code == 404
+    assert client.get(f"/medicines/{a}", headers=headers).json()["quantity"] == 5
+
+
+def test_cached_search_page_is_served_byte_for_byte(client: TestClient):
+    t = create_admin_token(client, username="muser5", password="pwd5")
+    headers = {"Authorization": f"Bearer {t}"}
+    for i in range(12):
+        assert client.post("/medicines", json={"name": f"Cachemol-{i:02d}", "quantity": i}, headers=headers).status_code == 201
+
+    first = client.get("/medicines?q=Cachemol", headers=headers)
+    again = client.get("/medicines?q=Cachemol", headers=headers)
+    assert first.status_code == again.status_code == 200
+    assert again.content == first.content
+    assert again.headers["content-type"] == "application/json"
+    assert again.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+    assert [m["name"] for m in again.json()][:2] == ["Cachemol-00", "Cachemol-01"]
+
+    nxt = client.get(f"/medicines?q=Cachemol&cursor={first.headers['X-Next-Cursor']}", headers=headers)
+    assert [m["name"] for m in nxt.json()] == ["Cachemol-10", "Cachemol-11"]
+    assert "X-Next-Cursor" not in nxt.headers
+
+
+def test_medicine_reads_revalidate_with_etag(client: TestClient, monkeypatch):
+    import app.cache
+    # as if the generations came from Redis: shared, and stable for the whole test
+    monkeypatch.setattr(app.cache, "GEN_TTL", 60)
+    monkeypatch.setattr(app.cache.cache, "shared_generation", app.cache.cache.generation)
+    t = create_admin_token(client, username="muser6", password="pwd6")
+    headers = {"Authorization": f"Bearer {t}"}
+    mid = client.post("/medicines", json={"name": "Etagazole", "quantity": 3}, headers=headers).json()["id"]
+
+    page = client.get("/medicines?q=Etagaz", headers=headers)
+    one = client.get(f"/medicines/{mid}", headers=headers)
+    for r, url in ((page, "/medicines?q=Etagaz"), (one, f"/medicines/{mid}")):
+        assert client.get(url, headers={**headers, "If-None-Match": r.headers["ETag"]}).status_code == 304
+
+    client.patch(f"/medicines/{mid}/adjust?delta=1", headers=headers)
+    for r, url in ((page, "/medicines?q=Etagaz"), (one, f"/medicines/{mid}")):
+        fresh = client.get(url, headers={**headers, "If-None-Match": r.headers["ETag"]})
+        assert fresh.status_code == 200 and fresh.headers["ETag"] != r.headers["ETag"]
+    assert fresh.json()["quantity"] == 4
+
+
+def test_suggest_sees_writes_from_other_workers(client: TestClient, db_session):
+    from app.cache import cache
+    from app.models import Medicine
+    t = create_admin_token(client, username="muser7", password="pwd7")
+    headers = {"Authorization": f"Bearer {t}"}
+    client.post("/medicines", json={"name": "Zolpidem", "quantity": 3}, headers=headers)
+    assert [m["name"] for m in client.get("/medicines/suggest?q=zo", headers=headers).json()] == ["Zolpidem"]
+
+    # another worker inserts and bumps the shared generation; our index never saw the row
+    db_session.add(Medicine(name="Zonisamide", quantity=1))
+    db_session.commit()
+    cache.invalidate("medicines")
+    names = [m["name"] for m in client.get("/medicines/suggest?q=zo", headers=headers).json()]
+    assert names == ["Zolpidem", "Zonisamide"]
+
+
+def test_suggest_does_not_reload_without_writes(client: TestClient, monkeypatch):
+    import time
+    import app.cache
+    from app.search import medicine_index
+    monkeypatch.setattr(app.cache, "GEN_TTL", 0.01)
+    t = create_admin_token(client, username="muser8", password="pwd8")
+    headers = {"Authorization": f"Bearer {t}"}
+    client.post("/medicines", json={"name": "Quetiapine", "quantity": 2}, headers=headers)
+    assert client.get("/medicines/suggest?q=que", headers=headers).status_code == 200
+
+    loads = []
+    monkeypatch.setattr(medicine_index, "load", lambda db: loads.append(db))
+    time.sleep(0.02)  # past GEN_TTL: no Redis here, the generation must not have moved
+    names = [m["name"] for m in client.get("/medicines/suggest?q=que", headers=headers).json()]
+    assert names == ["Quetiapine"] and loads == []
@@ -0,0 +1,36 @@
+# tests/test_metrics.py
+from fastapi.testclient import TestClient
+
+
+def metric_value(text: str, prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{prefix} not exported")
+
+
+def test_metrics_report_routes_sql_and_cache(client: TestClient):
+    client.post("/users/create", json={"username": "metrics", "password": "pw", "role": "doctor"})
+    token = client.post("/users/token", data={"username": "metrics", "password": "pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    pid = client.post("/patients", json={"first_name": "Metra"}, headers=headers).json()["id"]
+    for _ in range(2):
+        assert client.get(f"/patients/{pid}", headers=headers).status_code == 200
+    assert client.get("/patients/999999", headers=headers).status_code == 404
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    text = r.text
+
+    # labelled by route template, not by raw path
+    route = 'method="GET",route="/patients/{patient_id}"'
+    assert metric_value(text, f'http_requests_total{{{route},status="200"}}') >= 2
+    assert metric_value(text, f'http_requests_total{{{route},status="404"}}') >= 1
+    assert metric_value(text, f'http_request_duration_seconds_count{{{route}}}') >= 3
+    assert "/patients/999999" not in text
+    # the cached read issues no SQL, the miss issues some
+    assert metric_value(text, f'db_statements_per_request_bucket{{{route},le="0"}}') >= 1
+    assert metric_value(text, f'db_statements_per_request_sum{{{route}}}') >= 1
+    assert metric_value(text, "http_requests_in_flight") == 1  # the scrape itself
+    assert 'cache_l1_hits_total{namespace="patient"}' in text
@@ -36,3 +36,220 @@ def test_list_patients_pagination(client: TestClient):
     r = client.get("/patients?page=1", headers=headers)
     assert r.status_code == 200
     assert len(r.json()) <= 10
+
+
+def test_list_patients_cursor_pagination(client: TestClient):
+    token = create_token(client, username="puser3", password="pwd3")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    for i in range(25):
+        client.post("/patients", json={"first_name": f"Cursor{i}"}, headers=headers)
+
+    # walk the whole table by cursor: ids strictly increase and never repeat
+    seen = []
+    r = client.get("/patients?page=1", headers=headers)
+    while True:
+        assert r.status_code == 200
+        seen.extend(p["id"] for p in r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        r = client.get(f"/patients?cursor={cursor}", headers=headers)
+    assert seen == sorted(set(seen))
+    assert len(seen) >= 25
+
+    r = client.get("/patients?cursor=not-a-cursor", headers=headers)
+    assert r.status_code == 400
+
+
+def test_search_patients_substring(client: TestClient):
+    token = create_token(client, username="puser4", password="pwd4")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    r = client.post("/patients", json={"first_name": "Zubairah", "last_name": "Quill", "phone": "5550001234"}, headers=headers)
+    pid = r.json()["id"]
+
+    for q in ("Zub", "zubair", "quill", "1234", "Zub Quill"):
+        r = client.get(f"/patients?q={q}", headers=headers)
+        assert r.status_code == 200
+        assert [p["id"] for p in r.json()] == [pid], q
+
+    r = client.get("/patients?q=Nobody", headers=headers)
+    assert r.json() == []
+
+    # shorter than a trigram: still substring matching, as before the index
+    for q in ("ub", "ll", "00"):
+        assert pid in [p["id"] for p in client.get(f"/patients?q={q}", headers=headers).json()], q
+
+
+def test_ranked_search_pages_by_offset_within_window(client: TestClient, monkeypatch):
+    from app import search
+
+    token = create_token(client, username="puser_rank", password="pwd")
+    headers = {"Authorization": f"Bearer {token}"}
+    ids = {client.post("/patients", json={"first_name": f"Rankwell{i}"}, headers=headers).json()["id"] for i in range(25)}
+    monkeypatch.setattr(search, "SEARCH_WINDOW", 20)
+
+    seen, url = [], "/patients?q=Rankwell"
+    while url:
+        r = client.get(url, headers=headers)
+        assert r.status_code == 200
+        seen += [p["id"] for p in r.json()]
+        nxt = r.headers.get("X-Next-Cursor")
+        url = f"/patients?q=Rankwell&cursor={nxt}" if nxt else None
+    assert len(seen) == len(set(seen)) == 20  # no repeats, capped at the window
+    assert set(seen) <= ids
+
+
+def test_bulk_import_csv_and_ndjson(client: TestClient):
+    token = create_token(client, username="puser5", password="pwd5")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    csv_body = "first_name,last_name,phone\nBulkA,One,111\n,Missing,222\n\"Bulk, B\",Two,333\n"
+    r = client.post("/patients/bulk", files={"file": ("p.csv", csv_body, "text/csv")}, headers=headers)
+    assert r.status_code == 200
+    report = r.json()
+    assert report["inserted"] == 2 and report["failed"] == 1
+    assert report["errors"][0]["row"] == 2
+
+    ndjson_body = '{"first_name": "BulkC"}\nnot json\n{"last_name": "NoFirst"}\n'
+    r = client.post("/patients/bulk?format=ndjson", files={"file": ("p.txt", ndjson_body)}, headers=headers)
+    report = r.json()
+    assert report["inserted"] == 1 and [e["row"] for e in report["errors"]] == [2, 3]
+
+    # imported rows are searchable straight away (FTS triggers cover bulk inserts)
+    r = client.get("/patients?q=BulkC", headers=headers)
+    assert [p["first_name"] for p in r.json()] == ["BulkC"]
+
+
+def test_bulk_import_reports_unreadable_file_and_keeps_earlier_rows(client: TestClient):
+    token = create_token(client, username="puser10", password="pwd10")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # bytes are decoded in blocks: put the bad byte well past the first one
+    rows = "".join(f"Enc{i},Row,{i}\n" for i in range(1000))
+    body = ("first_name,last_name,phone\n" + rows).encode() + b"\xff\xfe,Bad,0\n"
+    r = client.post("/patients/bulk", files={"file": ("p.csv", body, "text/csv")}, headers=headers)
+    assert r.status_code == 200
+    report = r.json()
+    assert 0 < report["inserted"] <= 1000 and report["failed"] == 1
+    assert report["errors"][-1]["row"] == report["inserted"] + 1
+    assert "UTF-8" in report["errors"][-1]["error"]
+
+    body = "first_name,last_name\nFine,Row\nHuge," + "x" * 200_000 + "\n"
+    r = client.post("/patients/bulk", files={"file": ("p.csv", body, "text/csv")}, headers=headers)
+    report = r.json()
+    assert report["inserted"] == 1
+    assert report["errors"] == [{"row": 2, "error": "malformed CSV: field larger than field limit (131072)"}]
+
+
+def test_export_patients_streams_ndjson_and_csv(client: TestClient):
+    import csv
+    import io
+    import json
+
+    token = create_token(client, username="exporter", password="pwd", role="admin")
+    headers = {"Authorization": f"Bearer {token}"}
+    client.post("/patients", json={"first_name": "Export, Me", "phone": "42"}, headers=headers)
+
+    r = client.get("/patients/export", headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [p["id"] for p in rows] == sorted(p["id"] for p in rows)
+    assert any(p["first_name"] == "Export, Me" for p in rows)
+
+    r = client.get("/patients/export?format=csv", headers=headers)
+    table = list(csv.DictReader(io.StringIO(r.text)))
+    assert len(table) == len(rows)
+    assert any(p["first_name"] == "Export, Me" for p in table)
+
+
+def test_patient_timeline_pages_with_fixed_queries(client: TestClient, db_session):
+    from datetime import datetime, timedelta
+    from sqlalchemy import event
+
+    headers = {"Authorization": f"Bearer {create_token(client, username='puser_tl')}"}
+    pid = client.post("/patients", json={"first_name": "Tima"}, headers=headers).json()["id"]
+    base = datetime.utcnow().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=60)
+    ids = [client.post("/appointments", json={"patient_id": pid, "scheduled_at": (base + timedelta(days=i)).isoformat()},
+                       headers=headers).json()["id"] for i in range(3)]
+    client.patch(f"/appointments/{ids[0]}/reschedule", params={"new_time": (base + timedelta(hours=2)).isoformat()},
+                 headers=headers)
+
+    statements = []
+    listener = lambda conn, cursor, stmt, *a: statements.append(stmt)
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        r = client.get(f"/patients/{pid}/timeline?limit=2", headers=headers)
+        assert len(statements) == 3  # patient, appointments, selectin history
+        assert client.get(f"/patients/{pid}/timeline?limit=2", headers=headers).json() == r.json()
+        assert len(statements) == 3  # second read served from cache
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    body = r.json()
+    assert body["patient"]["first_name"] == "Tima"
+    assert [a["id"] for a in body["appointments"]] == [ids[2], ids[1]]  # newest first
+    r2 = client.get(f"/patients/{pid}/timeline?limit=2&cursor={r.headers['x-next-cursor']}", headers=headers)
+    assert [a["id"] for a in r2.json()["appointments"]] == [ids[0]]
+    assert [h["status"] for h in r2.json()["appointments"][0]["history"]] == ["scheduled", "scheduled"]
+
+    # appointment writes invalidate the cached timeline
+    client.patch(f"/appointments/{ids[2]}/cancel", headers=headers)
+    latest = client.get(f"/patients/{pid}/timeline?limit=2", headers=headers).json()["appointments"][0]
+    assert latest["status"] == "canceled"
+    assert [h["status"] for h in latest["history"]] == ["scheduled", "canceled"]
+    assert client.get("/patients/999999/timeline", headers=headers).status_code == 404
+
+
+def test_get_patient_conditional_get(client: TestClient, db_session, monkeypatch):
+    from sqlalchemy import event
+    import app.cache
+    # as if the generations came from Redis: shared, and stable for the whole test
+    monkeypatch.setattr(app.cache, "GEN_TTL", 60)
+    monkeypatch.setattr(app.cache.cache, "shared_generation", app.cache.cache.generation)
+
+    token = create_token(client, username="puser9", password="pwd9")
+    headers = {"Authorization": f"Bearer {token}"}
+    pid = client.post("/patients", json={"first_name": "Etag"}, headers=headers).json()["id"]
+
+    r = client.get(f"/patients/{pid}", headers=headers)
+    tag = r.headers["ETag"]
+    assert r.status_code == 200 and tag.startswith('"')
+    assert "no-cache" in r.headers["Cache-Control"]
+
+    statements = []
+    engine = db_session.get_bind()
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        r = client.get(f"/patients/{pid}", headers={**headers, "If-None-Match": f'W/{tag}, "other"'})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert r.status_code == 304 and r.content == b""
+    assert r.headers["ETag"] == tag
+    assert not [s for s in statements if "patients" in s]
+
+    # an appointment write bumps the patient's namespace, so the old tag no longer matches
+    client.post("/appointments", json={"patient_id": pid, "scheduled_at": "2031-03-01T10:00:00"}, headers=headers)
+    r = client.get(f"/patients/{pid}", headers={**headers, "If-None-Match": tag})
+    assert r.status_code == 200 and r.headers["ETag"] != tag
+
+
+def test_no_etag_without_shared_generations(client: TestClient):
+    token = create_token(client, username="puser11", password="pwd11")
+    headers = {"Authorization": f"Bearer {token}"}
+    pid = client.post("/patients", json={"first_name": "Local"}, headers=headers).json()["id"]
+
+    # no Redis here: generations are process-local, so no worker may hand out a validator
+    r = client.get(f"/patients/{pid}", headers=headers)
+    assert r.status_code == 200 and "ETag" not in r.headers
+    assert "no-cache" in r.headers["Cache-Control"]
+
+    # "*" matches only a resource that exists
+    r = client.get(f"/patients/{pid}", headers={**headers, "If-None-Match": "*"})
+    assert r.status_code == 304
+    r = client.get(f"/patients/{pid + 1000}", headers={**headers, "If-None-Match": "*"})
+    assert r.status_code == 404
@@ -0,0 +1,150 @@
+# tests/test_query_plans.py
+# Runs the service queries issued by the API through EXPLAIN QUERY PLAN and fails
+# on full table scans. Allowed: FTS virtual-table lookups, scans of a partial index
+# (they only visit matching rows) and the statements named in ALLOWED_SCANS.
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, inspect, text
+from app import models
+from app.migrations import LATEST, current_version, migrate
+from app.pagination import encode_cursor
+from app.reminders import ReminderScheduler
+
+SCAN = re.compile(r"^SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?")
+
+# name: (plan line, pattern of the whitespace-collapsed SQL, why the scan is accepted)
+ALLOWED_SCANS = {
+    "patients offset page": (
+        "SCAN patients", r"FROM patients ORDER BY patients\.id LIMIT \? OFFSET \?$",
+        "walks the table in id (rowid) order and stops after OFFSET + LIMIT rows; cursors seek instead"),
+    "appointments offset page": (
+        "SCAN appointments USING INDEX ix_appointments_scheduled_at",
+        r"FROM appointments ORDER BY appointments\.scheduled_at, appointments\.id LIMIT \? OFFSET \?$",
+        "walks ix_appointments_scheduled_at in order and stops after OFFSET + LIMIT rows; no sort"),
+    "patient short-query substring": (
+        "SCAN patients",
+        r"WHERE patients\.first_name LIKE \? OR patients\.last_name LIKE \? OR patients\.phone LIKE \? "
+        r"ORDER BY patients\.id LIMIT",
+        "queries under 3 characters are too short for the trigram FTS index, so '%q%' is matched row by row"),
+    "medicine substring page": (
+        "SCAN medicines USING INDEX ix_medicines_name",
+        r"WHERE medicines\.name LIKE \? ORDER BY medicines\.name, medicines\.id LIMIT",
+        "'%q%' can't use an index; walks ix_medicines_name in order and stops once the page is full"),
+    "revocation cutoffs": (
+        "SCAN token_cutoffs", r"FROM token_cutoffs$",
+        "one row per user signed out everywhere, loaded whole when the revocation version moves"),
+    "reconcile patient count": (
+        "SCAN patients USING COVERING INDEX ix_patients_id", r"^SELECT count\(\*\) AS count_1 FROM \(SELECT patients\.id",
+        "counting every patient is inherently a full pass; runs only when the counters are reconciled"),
+}
+
+
+def allowed(detail: str, stmt: str, plan) -> bool:
+    # an allowed scan must still come out in index order: a sort means it reads everything
+    if any("TEMP B-TREE" in d for d in plan):
+        return False
+    sql = " ".join(stmt.split())
+    return any(detail == want and re.search(pattern, sql) for want, pattern, _ in ALLOWED_SCANS.values())
+
+
+@contextmanager
+def captured_statements(engine):
+    statements = []
+
+    def listener(conn, cursor, stmt, params, context, executemany):
+        if not executemany and stmt.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            statements.append((stmt, params))
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+def full_scans(engine, statements):
+    problems = []
+    with engine.connect() as conn:
+        partial = {name for name, sql in conn.exec_driver_sql(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql LIKE '% WHERE %'")}
+        for stmt, params in statements:
+            plan = [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + stmt, params)]
+            for detail in plan:
+                m = SCAN.match(detail)
+                if m and "VIRTUAL TABLE" not in detail and m.group(2) not in partial and not allowed(detail, stmt, plan):
+                    problems.append(f"{detail}\n    {stmt}")
+    return problems
+
+
+def token(client, username, role="admin"):
+    client.post("/users/create", json={"username": username, "password": "pw", "role": role})
+    return client.post("/users/token", data={"username": username, "password": "pw"}).json()["access_token"]
+
+
+def test_service_queries_use_indexes(client: TestClient, db_session):
+    engine = db_session.get_bind()
+    headers = {"Authorization": f"Bearer {token(client, 'planner')}"}
+    client.get("/reports/overview", headers=headers)  # first read recounts; that is the one full count
+
+    with captured_statements(engine) as statements:
+        pid = client.post("/patients", json={"first_name": "Plan", "phone": "5550199"}, headers=headers).json()["id"]
+        client.get(f"/patients/{pid}", headers=headers)
+        client.get("/patients", headers=headers)
+        client.get("/patients", params={"cursor": encode_cursor(0)}, headers=headers)
+        client.get("/patients?q=Plan", headers=headers)
+        client.get("/patients?q=Pl", headers=headers)
+
+        at = datetime.utcnow().replace(hour=10, minute=0, second=0, microsecond=0) + timedelta(days=40)
+        aid = client.post("/appointments", json={"patient_id": pid, "scheduled_at": at.isoformat()},
+                          headers=headers).json()["id"]
+        client.patch(f"/appointments/{aid}/reschedule", params={"new_time": (at + timedelta(hours=1)).isoformat()},
+                     headers=headers)
+        client.get("/appointments", headers=headers)
+        client.get("/appointments?status=scheduled", headers=headers)
+        client.get("/appointments", params={"cursor": encode_cursor(at.isoformat(), 0)}, headers=headers)
+        client.get(f"/appointments/availability?date={at.date()}", headers=headers)
+        client.patch(f"/appointments/{aid}/cancel", headers=headers)
+        client.get(f"/patients/{pid}/timeline", headers=headers)
+
+        mid = client.post("/medicines", json={"name": "Planamol", "quantity": 3}, headers=headers).json()["id"]
+        client.get(f"/medicines/{mid}", headers=headers)
+        client.get("/medicines?q=Plan", headers=headers)
+        client.patch(f"/medicines/{mid}/adjust?delta=-1", headers=headers)
+        client.patch("/medicines/adjust-batch", json=[{"medicine_id": mid, "delta": 2}], headers=headers)
+
+        sched = ReminderScheduler(sender=lambda batch: None, worker_id="plans")
+        sched.run_once()
+        sched.refill(db_session)
+        sched.backfill(db_session)
+
+    assert statements
+    assert full_scans(engine, statements) == []
+
+
+def test_reconcile_counts_use_indexes(db_session):
+    from app.counters import counters
+    engine = db_session.get_bind()
+    with captured_statements(engine) as statements:
+        counters.reconcile(db_session)
+    # counting every patient is inherently a full pass; the other two counts must not be
+    assert full_scans(engine, statements) == []
+
+
+def test_migrations_upgrade_an_existing_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    new = ["ix_appointments_status_scheduled_at", "ix_appointments_scheduled_at",
+           "ix_appointments_patient_id_scheduled_at", "ix_medicines_low_stock", "ix_reminder_jobs_status_due_at"]
+    with engine.begin() as conn:  # what a database from before the indexes looks like
+        for name in new:
+            conn.execute(text(f"DROP INDEX {name}"))
+
+    assert migrate(engine) == [LATEST]
+    insp = inspect(engine)
+    present = {ix["name"] for t in ("appointments", "medicines", "reminder_jobs") for ix in insp.get_indexes(t)}
+    assert set(new) <= present
+    assert migrate(engine) == []  # idempotent
+    with engine.connect() as conn:
+        assert current_version(conn) == LATEST
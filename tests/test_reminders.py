@@ -0,0 +1,109 @@
+# tests/test_reminders.py
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from app.models import ReminderJob
+from app.reminders import REMINDER_MAX_ATTEMPTS, REMINDER_OFFSET, ReminderScheduler
+
+
+def create_doctor_token(client: TestClient, username="remdoc", password="pwd"):
+    client.post("/users/create", json={"username": username, "password": password, "role": "doctor"})
+    r = client.post("/users/token", data={"username": username, "password": password})
+    return r.json()["access_token"]
+
+
+def collecting_scheduler(sent, **kw):
+    return ReminderScheduler(sender=lambda batch: sent.extend(r["appointment_id"] for r in batch), **kw)
+
+
+def test_reminders_follow_reschedule_and_cancel(client: TestClient, db_session):
+    headers = {"Authorization": f"Bearer {create_doctor_token(client)}"}
+    pid = client.post("/patients", json={"first_name": "Remi", "phone": "555-0100"}, headers=headers).json()["id"]
+    at = datetime.utcnow() + timedelta(days=3)
+    aid = client.post("/appointments", json={"patient_id": pid, "scheduled_at": at.isoformat()},
+                      headers=headers).json()["id"]
+    job = db_session.query(ReminderJob).filter_by(appointment_id=aid).one()
+    assert job.status == "pending" and job.due_at == at - REMINDER_OFFSET
+
+    sent = []
+    sched = collecting_scheduler(sent)
+    sched.run_once()
+    assert aid not in sent  # not due yet
+
+    later = at + timedelta(days=1)
+    client.patch(f"/appointments/{aid}/reschedule", params={"new_time": later.isoformat()}, headers=headers)
+    sched.run_once(now=at - REMINDER_OFFSET + timedelta(seconds=1))
+    assert aid not in sent  # moved with the appointment
+    sched.run_once(now=later - REMINDER_OFFSET + timedelta(seconds=1))
+    assert sent.count(aid) == 1
+    sched.run_once(now=later - REMINDER_OFFSET + timedelta(seconds=2))
+    assert sent.count(aid) == 1  # sent once
+
+    aid2 = client.post("/appointments", json={"patient_id": pid, "scheduled_at": at.isoformat()},
+                       headers=headers).json()["id"]
+    client.patch(f"/appointments/{aid2}/cancel", headers=headers)
+    sched.run_once(now=at)
+    assert aid2 not in sent
+
+
+def test_each_due_job_is_claimed_by_one_worker(client: TestClient, db_session):
+    headers = {"Authorization": f"Bearer {create_doctor_token(client, username='remdoc2')}"}
+    pid = client.post("/patients", json={"first_name": "Claim"}, headers=headers).json()["id"]
+    at = datetime.utcnow() + timedelta(hours=1)  # inside the offset: due right away
+    ids = [client.post("/appointments", json={"patient_id": pid, "scheduled_at": (at + timedelta(hours=i)).isoformat()},
+                       headers=headers).json()["id"] for i in range(5)]
+
+    sent_a, sent_b = [], []
+    a = collecting_scheduler(sent_a, batch_size=2, worker_id="a")
+    b = collecting_scheduler(sent_b, batch_size=2, worker_id="b")
+    now = datetime.utcnow()
+    assert a.claim(db_session, now) and b.claim(db_session, now)
+    a.run_once(now)
+    b.run_once(now)
+    # the two pre-claimed batches were never sent: another worker takes them once the lease lapses
+    a.run_once(now + a.lease + timedelta(seconds=1))
+    sent = [i for i in sent_a + sent_b if i in ids]
+    assert sorted(sent) == sorted(ids)  # every job exactly once
+
+
+def test_reclaimed_leases_count_attempts_and_give_up(client: TestClient, db_session):
+    headers = {"Authorization": f"Bearer {create_doctor_token(client, username='remdoc3')}"}
+    pid = client.post("/patients", json={"first_name": "Crash"}, headers=headers).json()["id"]
+    at = datetime.utcnow() + timedelta(hours=12)  # due right away, clear of other tests' slots
+    aid = client.post("/appointments", json={"patient_id": pid, "scheduled_at": at.isoformat()},
+                      headers=headers).json()["id"]
+    job_id = db_session.query(ReminderJob.id).filter_by(appointment_id=aid).scalar()
+
+    # every worker that claims the job dies before finishing it
+    now = datetime.utcnow()
+    for n in range(REMINDER_MAX_ATTEMPTS):
+        worker = collecting_scheduler([], worker_id=f"crash{n}")
+        assert job_id in worker.claim(db_session, now)
+        now += worker.lease + timedelta(seconds=1)
+    last = collecting_scheduler([], worker_id="last")
+    assert job_id not in last.claim(db_session, now)
+    job = db_session.get(ReminderJob, job_id)
+    db_session.refresh(job)
+    assert job.status == "failed" and job.attempts == REMINDER_MAX_ATTEMPTS
+
+
+def test_lapsed_lease_is_reclaimed_on_an_idle_queue(client: TestClient, db_session):
+    headers = {"Authorization": f"Bearer {create_doctor_token(client, username='remdoc4')}"}
+    pid = client.post("/patients", json={"first_name": "Idle"}, headers=headers).json()["id"]
+    at = datetime.utcnow() + timedelta(hours=20)  # due right away
+    aid = client.post("/appointments", json={"patient_id": pid, "scheduled_at": at.isoformat()},
+                      headers=headers).json()["id"]
+    job_id = db_session.query(ReminderJob.id).filter_by(appointment_id=aid).scalar()
+    dead = collecting_scheduler([], worker_id="dead")
+    assert job_id in dead.claim(db_session, datetime.utcnow() - dead.lease - timedelta(seconds=1))
+
+    # a fresh worker whose heap holds nothing else still wakes up for the lapsed lease
+    sent = []
+    sched = collecting_scheduler(sent, worker_id="idle")
+    sched.refill(db_session)
+    with sched._cond:
+        assert sched._next_due() is not None and sched._next_due() <= datetime.utcnow()
+    sched.run_once()
+    assert aid in sent
+    job = db_session.get(ReminderJob, job_id)
+    db_session.refresh(job)
+    assert job.status == "sent" and job.attempts == 2
@@ -0,0 +1,57 @@
+# tests/test_reports.py
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.counters import counters
+
+
+def create_admin_token(client: TestClient, username="ruser", password="pwd"):
+    client.post("/users/create", json={"username": username, "password": password, "role": "admin"})
+    r = client.post("/users/token", data={"username": username, "password": password})
+    return r.json()["access_token"]
+
+
+def test_overview_is_maintained_without_recounting(client: TestClient, db_session):
+    t = create_admin_token(client)
+    headers = {"Authorization": f"Bearer {t}"}
+    before = client.get("/reports/overview", headers=headers).json()
+
+    pid = client.post("/patients", json={"first_name": "Rita", "last_name": "Count"}, headers=headers).json()["id"]
+    when = (datetime.utcnow() + timedelta(days=3)).isoformat()
+    aid = client.post("/appointments", json={"patient_id": pid, "scheduled_at": when}, headers=headers).json()["id"]
+    mid = client.post("/medicines", json={"name": "Countamol", "quantity": 20, "reorder_threshold": 5},
+                      headers=headers).json()["id"]
+    client.patch(f"/medicines/{mid}/adjust?delta=-16", headers=headers)
+
+    statements = []
+    listener = lambda conn, cursor, stmt, *a: statements.append(stmt)
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        after = client.get("/reports/overview", headers=headers).json()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert not any("count(" in s.lower() for s in statements)
+    assert after["total_patients"] == before["total_patients"] + 1
+    assert after["upcoming_appointments"] == before["upcoming_appointments"] + 1
+    assert after["low_stock_medicines"] == before["low_stock_medicines"] + 1
+
+    client.patch(f"/appointments/{aid}/cancel", headers=headers)
+    r = client.get("/reports/overview", headers=headers).json()
+    assert r["upcoming_appointments"] == before["upcoming_appointments"]
+
+    # incremental values agree with a full recount
+    recount = counters.reconcile(db_session)
+    assert all(int(recount[k]) == v for k, v in r.items())
+
+
+def test_clamped_adjust_forces_recount(client: TestClient):
+    t = create_admin_token(client, username="ruser2", password="pwd2")
+    headers = {"Authorization": f"Bearer {t}"}
+    mid = client.post("/medicines", json={"name": "Clampol", "quantity": 30, "reorder_threshold": 5},
+                      headers=headers).json()["id"]
+    before = client.get("/reports/overview", headers=headers).json()
+    client.patch(f"/medicines/{mid}/adjust?delta=-100", headers=headers)
+    after = client.get("/reports/overview", headers=headers).json()
+    assert after["low_stock_medicines"] == before["low_stock_medicines"] + 1